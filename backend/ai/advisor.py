@@ -2,13 +2,47 @@
 AI经营建议模块
 基于规则引擎的智能建议生成
 """
-from typing import List, Dict, Optional
+import json
+import numpy as np
+from typing import List, Dict, Iterable, Optional, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy import func, case, and_, or_
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
-from models import Product, Order, Merchant
+from config import settings
+from models import Product, Merchant, MerchantSuggestion, AdvisorDirtyProduct, DailyProductSales
+from ai.rules import get_rule_set
+from ai.forecast import SalesForecast, forecast_sales, stockout_metrics
+
+# 规则条件与文案模板中可引用的商品指标
+RULE_METRICS = [
+    "stock",  # 当前库存
+    "price",  # 当前价格
+    "recent_sales",  # 近7天销量
+    "previous_sales",  # 前7天销量
+    "monthly_sales",  # 近30天销量
+    "turnover_rate",  # 库存周转率
+    "change_pct",  # 销量环比变化率（%）
+    "avg_price",  # 同类目平均价格
+    "days_to_stockout",  # 预计售罄天数
+    "reorder_qty",  # 建议补货量
+]
+
+
+def window_starts(day: date) -> Tuple[datetime, datetime, datetime]:
+    """
+    按自然日对齐的统计窗口起点，同一天内窗口不随时间滑动，
+    商品指标只会因新订单或商品信息变更而变化
+    
+    Args:
+        day: 统计日期（窗口包含当天）
+        
+    Returns:
+        (近7天起点, 前7天起点, 近30天起点)
+    """
+    today = datetime.combine(day, datetime.min.time())
+    return today - timedelta(days=6), today - timedelta(days=13), today - timedelta(days=29)
 
 
 class BusinessAdvisor:
@@ -26,12 +60,21 @@ class BusinessAdvisor:
         """
         self.db = db
     
-    def get_merchant_suggestions(self, merchant_id: int) -> List[Dict]:
+    def get_merchant_suggestions(
+        self,
+        merchant_id: int,
+        product_ids: Optional[Set[int]] = None,
+        avg_prices: Optional[Dict[Optional[str], float]] = None,
+        day: Optional[date] = None
+    ) -> List[Dict]:
         """
         为商家生成经营建议
         
         Args:
             merchant_id: 商家ID
+            product_ids: 只分析这些商品，None表示商家所有商品
+            avg_prices: 已查询的类目均价，None表示按商品类目查询
+            day: 统计窗口对齐的日期，默认今天
             
         Returns:
             建议列表
@@ -39,49 +82,131 @@ class BusinessAdvisor:
         suggestions = []
         
         # 查询商家所有商品
-        products = self.db.query(Product).filter(
-            Product.merchant_id == merchant_id
-        ).all()
+        query = self.db.query(Product).filter(Product.merchant_id == merchant_id)
+        if product_ids is not None:
+            if not product_ids:
+                return suggestions
+            query = query.filter(Product.product_id.in_(list(product_ids)))
+        products = query.all()
+        if not products:
+            return suggestions
+        
+        # 一次聚合出所有商品的窗口销量与所需类目均价
+        sales_by_product = self._load_sales_windows(merchant_id, product_ids, day)
+        if avg_prices is None:
+            avg_prices = self._load_category_avg_prices({product.category for product in products})
+        # 所有商品的日销量序列一次拟合
+        forecast = forecast_sales(self.db, merchant_id, product_ids, day) if settings.ADVISOR_FORECAST else None
+        
+        if settings.ADVISOR_VECTORIZED:
+            return self._apply_rules_columnar(products, sales_by_product, avg_prices, forecast)
         
         for product in products:
             # 分析每个商品并生成建议
-            product_suggestion = self._analyze_product(product)
+            product_suggestion = self._analyze_product(
+                product,
+                sales_by_product.get(product.product_id, (0, 0, 0)),
+                avg_prices.get(product.category, 0),
+                forecast
+            )
             if product_suggestion:
                 suggestions.append(product_suggestion)
         
         return suggestions
     
-    def _analyze_product(self, product: Product) -> Optional[Dict]:
+    def _load_sales_windows(
+        self,
+        merchant_id: Optional[int] = None,
+        product_ids: Optional[Set[int]] = None,
+        day: Optional[date] = None
+    ) -> Dict[int, Tuple[int, int, int]]:
+        """
+        从日销量汇总表按商品聚合商家近30天销量，用条件求和同时得到各时间窗口的销量
+        
+        Args:
+            merchant_id: 商家ID，None表示聚合所有商家
+            product_ids: 只聚合这些商品，None表示不限
+            day: 统计窗口对齐的日期，默认今天
+            
+        Returns:
+            {商品ID: (近7天销量, 前7天销量, 近30天销量)}，无销量的商品不在结果中
+        """
+        seven_days_ago, fourteen_days_ago, thirty_days_ago = (
+            start.date() for start in window_starts(day or date.today())
+        )
+        
+        query = self.db.query(
+            DailyProductSales.product_id,
+            func.sum(case((DailyProductSales.sale_date >= seven_days_ago, DailyProductSales.quantity), else_=0)),
+            func.sum(case(
+                (and_(
+                    DailyProductSales.sale_date >= fourteen_days_ago,
+                    DailyProductSales.sale_date < seven_days_ago
+                ), DailyProductSales.quantity),
+                else_=0
+            )),
+            func.sum(DailyProductSales.quantity)
+        ).filter(DailyProductSales.sale_date >= thirty_days_ago)
+        if merchant_id is not None:
+            query = query.filter(DailyProductSales.merchant_id == merchant_id)
+        if product_ids is not None:
+            query = query.filter(DailyProductSales.product_id.in_(list(product_ids)))
+        rows = query.group_by(DailyProductSales.product_id).all()
+        
+        return {
+            product_id: (int(recent or 0), int(previous or 0), int(monthly or 0))
+            for product_id, recent, previous, monthly in rows
+        }
+    
+    def _load_category_avg_prices(
+        self,
+        categories: Optional[Set[Optional[str]]] = None
+    ) -> Dict[Optional[str], float]:
+        """
+        一次查询多个类目的在售商品平均价格
+        
+        Args:
+            categories: 类目集合（可包含None，表示未分类商品），None表示所有类目
+            
+        Returns:
+            {类目: 平均价格}
+        """
+        query = self.db.query(Product.category, func.avg(Product.price)).filter(Product.status == 1)
+        if categories is not None:
+            named = [category for category in categories if category is not None]
+            conditions = []
+            if named:
+                conditions.append(Product.category.in_(named))
+            if None in categories:
+                conditions.append(Product.category.is_(None))
+            if not conditions:
+                return {}
+            query = query.filter(or_(*conditions))
+        
+        rows = query.group_by(Product.category).all()
+        
+        return {category: float(avg_price or 0) for category, avg_price in rows}
+    
+    def _analyze_product(
+        self,
+        product: Product,
+        sales: Tuple[int, int, int],
+        avg_price: float,
+        forecast: Optional[SalesForecast] = None
+    ) -> Optional[Dict]:
         """
         分析单个商品并生成建议
         
         Args:
             product: 商品对象
+            sales: (近7天销量, 前7天销量, 近30天销量)
+            avg_price: 同类目平均价格
+            forecast: 销量预测结果，None表示按近30天日均销量估算售罄天数
             
         Returns:
             建议字典或None
         """
-        # 计算近7天销量
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        recent_sales = self.db.query(func.sum(Order.quantity)).filter(
-            Order.product_id == product.product_id,
-            Order.order_time >= seven_days_ago
-        ).scalar() or 0
-        
-        # 计算前7天销量（7-14天前）
-        fourteen_days_ago = datetime.now() - timedelta(days=14)
-        previous_sales = self.db.query(func.sum(Order.quantity)).filter(
-            Order.product_id == product.product_id,
-            Order.order_time >= fourteen_days_ago,
-            Order.order_time < seven_days_ago
-        ).scalar() or 0
-        
-        # 计算近30天销量
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        monthly_sales = self.db.query(func.sum(Order.quantity)).filter(
-            Order.product_id == product.product_id,
-            Order.order_time >= thirty_days_ago
-        ).scalar() or 0
+        recent_sales, previous_sales, monthly_sales = sales
         
         # 计算库存周转率
         turnover_rate = monthly_sales / product.stock if product.stock > 0 else 0
@@ -92,12 +217,6 @@ class BusinessAdvisor:
         else:
             change_pct = 100 if recent_sales > 0 else 0
         
-        # 查询同类目平均价格
-        avg_price = self.db.query(func.avg(Product.price)).filter(
-            Product.category == product.category,
-            Product.status == 1
-        ).scalar() or 0
-        
         # 应用规则引擎生成建议
         suggestion = self._apply_rules(
             product=product,
@@ -105,7 +224,9 @@ class BusinessAdvisor:
             change_pct=float(change_pct),
             turnover_rate=float(turnover_rate),
             monthly_sales=int(monthly_sales),
-            avg_price=float(avg_price)
+            avg_price=float(avg_price),
+            previous_sales=int(previous_sales),
+            forecast=forecast
         )
         
         return suggestion
@@ -117,10 +238,12 @@ class BusinessAdvisor:
         change_pct: float,
         turnover_rate: float,
         monthly_sales: int,
-        avg_price: float
+        avg_price: float,
+        previous_sales: int = 0,
+        forecast: Optional[SalesForecast] = None
     ) -> Optional[Dict]:
         """
-        应用规则引擎生成建议
+        对单个商品应用规则集生成建议
         
         Args:
             product: 商品对象
@@ -129,64 +252,143 @@ class BusinessAdvisor:
             turnover_rate: 库存周转率
             monthly_sales: 近30天销量
             avg_price: 同类目平均价格
+            previous_sales: 前7天销量
+            forecast: 销量预测结果
             
         Returns:
             建议字典或None
         """
-        suggestion_text = None
-        priority = "low"  # low, medium, high
-        
-        # 规则1：库存预警
-        if turnover_rate > 2 and product.stock < monthly_sales * 0.3:
-            days_to_empty = int(product.stock / (monthly_sales / 30)) if monthly_sales > 0 else 0
-            suggestion_text = f"库存不足，预计{days_to_empty}天售罄，建议及时补货"
-            priority = "high"
-        
-        # 规则2：滞销预警
-        elif recent_sales == 0 and product.stock > 50:
-            suggestion_text = "商品近期零销量且库存较高，建议降价促销或优化商品描述"
-            priority = "medium"
-        
-        # 规则3：促销建议
-        elif change_pct < -10 and turnover_rate < 0.5:
-            suggestion_text = f"销量环比下滑{abs(change_pct):.1f}%，建议设置限时折扣促销清库存"
-            priority = "medium"
-        
-        # 规则4：提价机会
-        elif change_pct > 20 and float(product.price) < avg_price * 0.9 and product.stock > 100:
-            suggested_price = float(product.price) * 1.1
-            suggestion_text = f"商品热销且价格低于市场均价，可适当提价至¥{suggested_price:.2f}增加利润"
-            priority = "low"
-        
-        # 规则5：库存过高预警
-        elif turnover_rate < 0.2 and product.stock > 200:
-            suggestion_text = f"库存周转率仅{turnover_rate:.2f}，建议优化库存管理或开展促销活动"
-            priority = "medium"
-        
-        # 规则6：补货建议
-        elif turnover_rate > 1.5 and product.stock < 50:
-            suggestion_text = "商品销售良好，建议增加备货量以满足需求"
-            priority = "low"
-        
-        # 如果有建议，返回
-        if suggestion_text:
-            return {
-                "product_id": product.product_id,
-                "product_name": product.name,
-                "suggestion": suggestion_text,
-                "priority": priority,
-                "metrics": {
-                    "recent_sales": recent_sales,
-                    "change_pct": round(change_pct, 2),
-                    "turnover_rate": round(turnover_rate, 2),
-                    "current_stock": product.stock,
-                    "current_price": float(product.price),
-                    "avg_category_price": round(avg_price, 2)
-                },
-                "generated_at": datetime.now().isoformat()
-            }
-        
-        return None
+        columns = {
+            "stock": np.array([product.stock], dtype=np.int64),
+            "price": np.array([float(product.price)]),
+            "recent_sales": np.array([recent_sales], dtype=np.int64),
+            "previous_sales": np.array([previous_sales], dtype=np.int64),
+            "monthly_sales": np.array([monthly_sales], dtype=np.int64),
+            "turnover_rate": np.array([turnover_rate]),
+            "change_pct": np.array([change_pct]),
+            "avg_price": np.array([avg_price]),
+        }
+        suggestions = self._evaluate_rules([product], columns, forecast)
+        return suggestions[0] if suggestions else None
+    
+    def _apply_rules_columnar(
+        self,
+        products: List[Product],
+        sales_by_product: Dict[int, Tuple[int, int, int]],
+        avg_prices: Dict[Optional[str], float],
+        forecast: Optional[SalesForecast] = None
+    ) -> List[Dict]:
+        """
+        列式规则引擎：把所有商品的指标装入numpy列，一次评估全部规则
+        
+        Args:
+            products: 商品列表
+            sales_by_product: {商品ID: (近7天销量, 前7天销量, 近30天销量)}
+            avg_prices: {类目: 同类目平均价格}
+            forecast: 销量预测结果
+            
+        Returns:
+            建议列表（保持商品顺序）
+        """
+        if not products:
+            return []
+        
+        stock = np.array([product.stock for product in products], dtype=np.int64)
+        sales = np.array(
+            [sales_by_product.get(product.product_id, (0, 0, 0)) for product in products],
+            dtype=np.int64
+        ).reshape(-1, 3)
+        recent_sales, previous_sales, monthly_sales = sales[:, 0], sales[:, 1], sales[:, 2]
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            turnover_rate = np.where(stock > 0, monthly_sales / np.where(stock > 0, stock, 1), 0.0)
+            change_pct = np.where(
+                previous_sales > 0,
+                (recent_sales - previous_sales) / np.where(previous_sales > 0, previous_sales, 1) * 100,
+                np.where(recent_sales > 0, 100.0, 0.0)
+            )
+        
+        columns = {
+            "stock": stock,
+            "price": np.array([float(product.price) for product in products]),
+            "recent_sales": recent_sales,
+            "previous_sales": previous_sales,
+            "monthly_sales": monthly_sales,
+            "turnover_rate": turnover_rate,
+            "change_pct": change_pct,
+            "avg_price": np.array([float(avg_prices.get(product.category, 0)) for product in products]),
+        }
+        return self._evaluate_rules(products, columns, forecast)
+    
+    def _evaluate_rules(
+        self,
+        products: List[Product],
+        columns: Dict[str, np.ndarray],
+        forecast: Optional[SalesForecast] = None
+    ) -> List[Dict]:
+        """
+        用编译后的规则集评估指标列，只为命中的商品生成建议
+        
+        Args:
+            products: 商品列表，与指标列按行对应
+            columns: 基础指标列，售罄天数与建议补货量在此补充
+            forecast: 销量预测结果，None表示按近30天日均销量估算
+            
+        Returns:
+            建议列表（保持商品顺序）
+        """
+        columns["days_to_stockout"], columns["reorder_qty"] = stockout_metrics(
+            forecast,
+            np.array([product.product_id for product in products], dtype=np.int64),
+            columns["stock"],
+            columns["monthly_sales"]
+        )
+        
+        rule_set = get_rule_set(settings.ADVISOR_RULES_FILE, RULE_METRICS)
+        matched = rule_set.evaluate(columns)
+        
+        suggestions = {}
+        generated_at = datetime.now().isoformat()
+        for rule_index, rule in enumerate(rule_set.rules):
+            rows = np.flatnonzero(matched == rule_index)
+            if len(rows) == 0:
+                continue
+            for row, text in zip(rows, rule.render(columns, rows)):
+                product = products[row]
+                suggestions[row] = {
+                    "product_id": product.product_id,
+                    "product_name": product.name,
+                    "suggestion": text,
+                    "priority": rule.priority,
+                    "metrics": {
+                        "recent_sales": int(columns["recent_sales"][row]),
+                        "change_pct": round(float(columns["change_pct"][row]), 2),
+                        "turnover_rate": round(float(columns["turnover_rate"][row]), 2),
+                        "current_stock": product.stock,
+                        "current_price": float(product.price),
+                        "avg_category_price": round(float(columns["avg_price"][row]), 2),
+                        "days_to_stockout": int(columns["days_to_stockout"][row]),
+                        "reorder_qty": int(columns["reorder_qty"][row])
+                    },
+                    "generated_at": generated_at
+                }
+        
+        return [suggestions[row] for row in sorted(suggestions)]
+
+
+def sort_suggestions(suggestions: List[Dict]) -> List[Dict]:
+    """
+    按优先级排序建议（原地排序）
+    
+    Args:
+        suggestions: 建议列表
+        
+    Returns:
+        排序后的建议列表
+    """
+    priority_order = {"high": 0, "medium": 1, "low": 2}
+    suggestions.sort(key=lambda x: (priority_order.get(x.get("priority", "low"), 3), x["product_id"]))
+    return suggestions
 
 
 def get_merchant_suggestions(db: Session, merchant_id: int) -> List[Dict]:
@@ -204,7 +406,230 @@ def get_merchant_suggestions(db: Session, merchant_id: int) -> List[Dict]:
     suggestions = advisor.get_merchant_suggestions(merchant_id)
     
     # 按优先级排序
-    priority_order = {"high": 0, "medium": 1, "low": 2}
-    suggestions.sort(key=lambda x: priority_order.get(x.get("priority", "low"), 3))
+    return sort_suggestions(suggestions)
+
+
+def mark_products_dirty(db: Session, merchant_id: int, product_ids: Iterable[int]):
+    """
+    标记商品的建议需要重新计算（随调用方事务一起提交）
     
-    return suggestions
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID
+        product_ids: 商品ID
+    """
+    now = datetime.now()
+    for product_id in set(product_ids):
+        db.add(AdvisorDirtyProduct(merchant_id=merchant_id, product_id=product_id, marked_at=now))
+
+
+def serialize_category_prices(avg_prices: Dict[Optional[str], float]) -> str:
+    """类目均价快照序列化为JSON（类目可能为None，按键值对列表保存）"""
+    return json.dumps([[category, round(price, 6)] for category, price in avg_prices.items()], ensure_ascii=False)
+
+
+def save_merchant_suggestions(
+    db: Session,
+    merchant_id: int,
+    suggestions: List[Dict],
+    generated_at: datetime,
+    avg_prices: Dict[Optional[str], float],
+    dirty_mark_id: int
+):
+    """
+    保存商家建议结果及其计算状态（覆盖旧结果，不提交事务）
+    
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID
+        suggestions: 已排序的建议列表
+        generated_at: 生成时间
+        avg_prices: 计算时使用的类目均价
+        dirty_mark_id: 已处理的脏标记最大ID
+    """
+    # 并发的按需重算可能同时为同一商家写入结果，用单条"插入，主键冲突时覆盖"语句代替先查后写
+    db.execute(_suggestion_upsert_statement(db, {
+        "merchant_id": merchant_id,
+        "suggestions": json.dumps(suggestions, ensure_ascii=False),
+        "suggestion_count": len(suggestions),
+        "generated_at": generated_at,
+        "window_date": generated_at.date(),
+        "category_prices": serialize_category_prices(avg_prices),
+        "dirty_mark_id": dirty_mark_id
+    }))
+
+
+def _suggestion_upsert_statement(db: Session, row: Dict):
+    """
+    构造"插入，主键冲突时覆盖"的语句，按数据库方言选择实现
+    
+    Args:
+        db: 数据库会话
+        row: 商家建议结果行
+    """
+    table = MerchantSuggestion.__table__
+    columns = [name for name in row if name != "merchant_id"]
+    dialect = db.get_bind().dialect.name
+    
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).values(row)
+        return statement.on_duplicate_key_update(
+            {name: statement.inserted[name] for name in columns}
+        )
+    
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"不支持的数据库: {dialect}")
+    statement = insert(table).values(row)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.merchant_id],
+        set_={name: statement.excluded[name] for name in columns}
+    )
+
+
+def _merchant_categories(db: Session, merchant_id: int) -> Set[Optional[str]]:
+    """商家商品涉及的类目"""
+    return {
+        category for category, in db.query(Product.category).filter(
+            Product.merchant_id == merchant_id
+        ).distinct()
+    }
+
+
+def recompute_merchant_suggestions(db: Session, merchant_id: int) -> Tuple[List[Dict], datetime]:
+    """
+    全量重新计算商家建议并保存
+    
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID
+        
+    Returns:
+        (建议列表, 生成时间)
+    """
+    generated_at = datetime.now()
+    dirty_mark_id = db.query(func.max(AdvisorDirtyProduct.id)).filter(
+        AdvisorDirtyProduct.merchant_id == merchant_id
+    ).scalar() or 0
+    
+    advisor = BusinessAdvisor(db)
+    avg_prices = advisor._load_category_avg_prices(_merchant_categories(db, merchant_id))
+    suggestions = sort_suggestions(
+        advisor.get_merchant_suggestions(merchant_id, avg_prices=avg_prices, day=generated_at.date())
+    )
+    save_merchant_suggestions(db, merchant_id, suggestions, generated_at, avg_prices, dirty_mark_id)
+    db.commit()
+    return suggestions, generated_at
+
+
+def update_merchant_suggestions(db: Session, stored: MerchantSuggestion) -> Tuple[List[Dict], datetime]:
+    """
+    增量更新已保存的商家建议，只重新评估上次计算后发生变化的商品：
+    - 有新订单或被商家修改（脏标记）的商品：读取ID大于已处理最大ID的标记，
+      以及上次计算前 ADVISOR_DIRTY_MARK_LAG_SECONDS 秒以来写入的标记——
+      标记ID在写入时分配，事务提交较晚的标记ID可能小于上次读到的最大ID
+    - 统计窗口跨天后，旧窗口内有订单的商品（其余商品各窗口销量仍为0）
+    - 同类目均价发生变化的商品
+    其余商品沿用已保存的建议
+    
+    Args:
+        db: 数据库会话
+        stored: 已保存的建议结果
+        
+    Returns:
+        (建议列表, 生成时间)
+    """
+    merchant_id = stored.merchant_id
+    now = datetime.now()
+    today = now.date()
+    
+    dirty_rows = db.query(AdvisorDirtyProduct.id, AdvisorDirtyProduct.product_id).filter(
+        AdvisorDirtyProduct.merchant_id == merchant_id,
+        AdvisorDirtyProduct.id > stored.dirty_mark_id
+    ).all()
+    dirty_rows += db.query(AdvisorDirtyProduct.id, AdvisorDirtyProduct.product_id).filter(
+        AdvisorDirtyProduct.merchant_id == merchant_id,
+        AdvisorDirtyProduct.marked_at >= stored.generated_at - timedelta(seconds=settings.ADVISOR_DIRTY_MARK_LAG_SECONDS)
+    ).all()
+    dirty = {product_id for _, product_id in dirty_rows}
+    dirty_mark_id = max([stored.dirty_mark_id] + [mark_id for mark_id, _ in dirty_rows])
+    
+    if stored.window_date != today:
+        # 跨天后只有旧窗口内有销量的商品指标会变化
+        _, _, previous_start = window_starts(stored.window_date)
+        dirty.update(
+            product_id for product_id, in db.query(DailyProductSales.product_id).filter(
+                DailyProductSales.merchant_id == merchant_id,
+                DailyProductSales.sale_date >= previous_start.date()
+            ).distinct()
+        )
+    
+    advisor = BusinessAdvisor(db)
+    categories = _merchant_categories(db, merchant_id)
+    avg_prices = advisor._load_category_avg_prices(categories)
+    previous_prices = {category: price for category, price in json.loads(stored.category_prices)}
+    changed = [
+        category for category in categories
+        if round(avg_prices.get(category, 0), 6) != previous_prices.get(category, 0)
+    ]
+    if changed:
+        named = [category for category in changed if category is not None]
+        conditions = []
+        if named:
+            conditions.append(Product.category.in_(named))
+        if None in changed:
+            conditions.append(Product.category.is_(None))
+        dirty.update(
+            product_id for product_id, in db.query(Product.product_id).filter(
+                Product.merchant_id == merchant_id,
+                or_(*conditions)
+            )
+        )
+    
+    suggestions = json.loads(stored.suggestions)
+    if not dirty and stored.window_date == today:
+        return suggestions, stored.generated_at
+    
+    refreshed = advisor.get_merchant_suggestions(merchant_id, product_ids=dirty, avg_prices=avg_prices, day=today)
+    suggestions = sort_suggestions(
+        [suggestion for suggestion in suggestions if suggestion["product_id"] not in dirty] + refreshed
+    )
+    save_merchant_suggestions(db, merchant_id, suggestions, now, avg_prices, dirty_mark_id)
+    db.commit()
+    return suggestions, now
+
+
+def get_stored_merchant_suggestions(
+    db: Session,
+    merchant_id: int,
+    refresh: bool = False
+) -> Tuple[List[Dict], datetime]:
+    """
+    读取离线生成的商家建议
+    开启增量模式（ADVISOR_INCREMENTAL）时只重新评估有变化的商品，
+    否则结果缺失或超过有效期时全量重新计算并保存
+    
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID
+        refresh: 忽略已保存的结果强制全量重新计算
+        
+    Returns:
+        (建议列表, 生成时间)
+    """
+    if not refresh:
+        stored = db.query(MerchantSuggestion).filter(
+            MerchantSuggestion.merchant_id == merchant_id
+        ).first()
+        if stored is not None:
+            if settings.ADVISOR_INCREMENTAL:
+                return update_merchant_suggestions(db, stored)
+            age = datetime.now() - stored.generated_at
+            if age <= timedelta(hours=settings.ADVISOR_SUGGESTIONS_MAX_AGE_HOURS):
+                return json.loads(stored.suggestions), stored.generated_at
+    
+    return recompute_merchant_suggestions(db, merchant_id)
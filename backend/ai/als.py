@@ -0,0 +1,377 @@
+"""
+隐式反馈矩阵分解推荐引擎
+交替最小二乘（Implicit ALS, Hu/Koren/Volinsky 2008），可通过配置 RECOMMENDER_BACKEND=als 启用
+
+置信度 c_ui = 1 + alpha·r_ui，偏好 p_ui = 1(r_ui > 0)，最小化
+    Σ c_ui (p_ui - x_uᵀy_i)² + λ(Σ‖x_u‖² + Σ‖y_i‖²)
+模型大小为 (用户数 + 商品数) × 因子数，打分为一次小规模矩阵-向量乘法
+"""
+import numpy as np
+from scipy import sparse
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable, Tuple
+
+from config import settings
+from ai.recommender import RecommendationEngine, write_model_files, lookup_indices, _new_version
+
+# 共轭梯度求解时每块的最大行数（控制 非零元素×因子数 的临时数组大小）
+_ALS_BLOCK_ROWS = 4096
+
+# 批量打分时单块打分矩阵的最大元素数（float32约64MB）
+_SCORE_BLOCK_CELLS = 1 << 24
+
+
+class ALSModel:
+    """
+    矩阵分解模型快照
+    训练完成后只读，由 ModelRegistry 整体替换，接口与 RecommendationModel 一致
+    """
+    
+    kind = "als"
+    
+    def __init__(
+        self,
+        user_ids: Optional[np.ndarray],
+        item_ids: Optional[np.ndarray],
+        user_factors: Optional[np.ndarray],
+        item_factors: Optional[np.ndarray],
+        version: str,
+        built_at: datetime,
+        regularization: float = 0.01,
+        alpha: float = 40.0
+    ):
+        """
+        初始化模型快照
+        
+        Args:
+            user_ids: 用户因子行对应的用户ID，升序排列（数据不足时为None）
+            item_ids: 商品因子行对应的商品ID，升序排列（数据不足时为None）
+            user_factors: 用户因子，形状为(用户数, 因子数)
+            item_factors: 商品因子，形状为(商品数, 因子数)
+            version: 模型版本号
+            built_at: 训练完成时间
+            regularization: 正则化系数（新用户折叠计算时使用）
+            alpha: 置信度系数（新用户折叠计算时使用）
+        """
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.version = version
+        self.built_at = built_at
+        self.regularization = regularization
+        self.alpha = alpha
+        # YᵀY，折叠计算新用户因子时按需计算一次
+        self._item_gram = None
+    
+    @property
+    def is_empty(self) -> bool:
+        """模型是否因数据不足而为空"""
+        return self.item_ids is None
+    
+    def save(self, directory: str) -> str:
+        """
+        将模型保存为 .npy 文件并发布为当前版本
+        
+        Args:
+            directory: 模型根目录
+        
+        Returns:
+            本版本的模型目录
+        """
+        arrays = {}
+        if not self.is_empty:
+            arrays = {
+                "user_ids": self.user_ids,
+                "item_ids": self.item_ids,
+                "user_factors": self.user_factors,
+                "item_factors": self.item_factors,
+                "hyperparameters": np.array([self.regularization, self.alpha], dtype=np.float64),
+            }
+        return write_model_files(directory, self.version, self.built_at, self.kind, arrays)
+    
+    @classmethod
+    def from_files(cls, version: str, built_at: datetime, meta: Dict, arrays: Dict[str, np.ndarray]) -> "ALSModel":
+        """
+        由内存映射的模型文件还原模型快照
+        
+        Args:
+            version: 模型版本号
+            built_at: 训练完成时间
+            meta: meta.json 内容
+            arrays: 名称 -> 只读 numpy.memmap
+        
+        Returns:
+            模型快照
+        """
+        if meta["empty"]:
+            return cls(None, None, None, None, version=version, built_at=built_at)
+        
+        regularization, alpha = arrays["hyperparameters"]
+        return cls(
+            user_ids=arrays["user_ids"],
+            item_ids=arrays["item_ids"],
+            user_factors=arrays["user_factors"],
+            item_factors=arrays["item_factors"],
+            version=version,
+            built_at=built_at,
+            regularization=float(regularization),
+            alpha=float(alpha)
+        )
+    
+    def _fold_in(self, purchased: np.ndarray) -> np.ndarray:
+        """
+        为训练后才有购买记录的用户即时求解用户因子（固定商品因子的一步最小二乘）
+        
+        Args:
+            purchased: 已购商品下标
+        
+        Returns:
+            用户因子向量
+        """
+        if self._item_gram is None:
+            self._item_gram = self.item_factors.T @ self.item_factors
+        
+        factors = self.item_factors[purchased]
+        confidence = 1 + self.alpha
+        gram = self._item_gram + (confidence - 1) * factors.T @ factors
+        gram += self.regularization * np.eye(gram.shape[0], dtype=gram.dtype)
+        return np.linalg.solve(gram, confidence * factors.sum(axis=0))
+    
+    def recommend(self, purchased_ids: Iterable[int], top_n: int, user_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        计算推荐分数：商品因子矩阵 × 用户因子向量
+        
+        Args:
+            purchased_ids: 用户已购买的商品ID
+            top_n: 推荐数量
+            user_id: 用户ID，不在模型中时由购买记录折叠计算用户因子
+        
+        Returns:
+            按分数降序排列的 (商品ID, 分数) 列表
+        """
+        if self.is_empty or top_n <= 0:
+            return []
+        positions, found = lookup_indices(self.item_ids, purchased_ids)
+        purchased = positions[found]
+        
+        user_rows, user_found = lookup_indices(self.user_ids, [user_id] if user_id is not None else [])
+        if user_found.any():
+            user_vector = self.user_factors[user_rows[0]]
+        elif len(purchased) > 0:
+            user_vector = self._fold_in(purchased)
+        else:
+            return []
+        
+        scores = self.item_factors @ user_vector
+        scores[purchased] = -np.inf
+        
+        top_n = min(top_n, len(scores) - len(purchased))
+        if top_n <= 0:
+            return []
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        
+        return [(int(self.item_ids[idx]), float(scores[idx])) for idx in top]
+    
+    def recommend_batch(
+        self,
+        user_ids: np.ndarray,
+        purchases: sparse.csr_matrix,
+        top_n: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        批量为多个用户计算推荐，按块做矩阵乘法控制打分矩阵大小
+        
+        Args:
+            user_ids: 购买矩阵各行对应的用户ID
+            purchases: 用户购买矩阵（行为用户，列与模型商品下标一致，已购为1）
+            top_n: 每个用户的推荐数量
+        
+        Returns:
+            每个用户一项 (商品ID数组, 分数数组)，按分数降序排列
+        """
+        n_items = len(self.item_ids)
+        block_size = max(1, _SCORE_BLOCK_CELLS // n_items)
+        purchases = purchases.tocsr()
+        
+        results = []
+        for start in range(0, len(user_ids), block_size):
+            end = min(start + block_size, len(user_ids))
+            block = purchases[start:end]
+            
+            user_rows, user_found = lookup_indices(self.user_ids, user_ids[start:end])
+            user_vectors = []
+            for offset in range(end - start):
+                if user_found[offset]:
+                    user_vectors.append(self.user_factors[user_rows[offset]])
+                else:
+                    user_vectors.append(self._fold_in(block.indices[block.indptr[offset]:block.indptr[offset + 1]]))
+            scores = np.asarray(user_vectors) @ self.item_factors.T
+            
+            # 屏蔽已购商品
+            rows = np.repeat(np.arange(end - start), np.diff(block.indptr))
+            scores[rows, block.indices] = -np.inf
+            
+            count = min(top_n, n_items)
+            top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            
+            for item_rows, item_scores in zip(top, top_scores):
+                valid = np.isfinite(item_scores)
+                results.append((self.item_ids[item_rows[valid]], item_scores[valid]))
+        
+        return results
+
+
+def _least_squares_cg(
+    confidence: sparse.csr_matrix,
+    targets: np.ndarray,
+    fixed: np.ndarray,
+    regularization: float,
+    cg_steps: int
+):
+    """
+    固定一侧因子，用共轭梯度原地更新另一侧因子
+    按行分块，块内所有行同时迭代（向量化），每步计算量为 O(非零元素×因子数)
+    
+    对每一行u求解 (YᵀY + Yᵀ(C_u - I)Y + λI)·x_u = YᵀC_u·p_u
+    
+    Args:
+        confidence: 置信度增量矩阵，元素为 alpha·r_ui（即 c_ui - 1）
+        targets: 待更新的因子（行数与 confidence 一致），原地更新
+        fixed: 固定的另一侧因子
+        regularization: 正则化系数
+        cg_steps: 每轮的共轭梯度迭代步数（以上一轮结果为初值）
+    """
+    gram = fixed.T @ fixed + regularization * np.eye(fixed.shape[1], dtype=fixed.dtype)
+    
+    for start in range(0, confidence.shape[0], _ALS_BLOCK_ROWS):
+        end = min(start + _ALS_BLOCK_ROWS, confidence.shape[0])
+        block = confidence[start:end]
+        rows = np.repeat(np.arange(end - start), np.diff(block.indptr))
+        cols = block.indices
+        weights = block.data
+        
+        def _matvec(vectors: np.ndarray) -> np.ndarray:
+            # A·v = (YᵀY + λI)·v + Σ_i (c_ui - 1)(y_i·v) y_i
+            dots = np.einsum("nf,nf->n", vectors[rows], fixed[cols]) * weights
+            return vectors @ gram + sparse.csr_matrix((dots, cols, block.indptr), shape=block.shape) @ fixed
+        
+        x = targets[start:end]
+        # 右端项 Σ_i c_ui y_i
+        b = sparse.csr_matrix((1 + weights, cols, block.indptr), shape=block.shape) @ fixed
+        r = b - _matvec(x)
+        p = r.copy()
+        rs_old = np.einsum("nf,nf->n", r, r)
+        
+        for _ in range(cg_steps):
+            if not np.any(rs_old > 1e-12):
+                break
+            ap = _matvec(p)
+            denominator = np.einsum("nf,nf->n", p, ap)
+            step = np.divide(rs_old, denominator, out=np.zeros_like(rs_old), where=denominator > 0)
+            x += step[:, None] * p
+            r -= step[:, None] * ap
+            rs_new = np.einsum("nf,nf->n", r, r)
+            beta = np.divide(rs_new, rs_old, out=np.zeros_like(rs_new), where=rs_old > 0)
+            p = r + beta[:, None] * p
+            rs_old = rs_new
+        
+        targets[start:end] = x
+
+
+class ALSRecommendationEngine(RecommendationEngine):
+    """
+    矩阵分解推荐引擎
+    复用 RecommendationEngine 的矩阵构建、结果组装与热门兜底，训练产出 ALSModel
+    """
+    
+    def __init__(self, db, model: Optional[ALSModel] = None):
+        """
+        初始化推荐引擎
+        
+        Args:
+            db: 数据库会话
+            model: 已训练的模型快照（为None时按需现场训练）
+        """
+        super().__init__(db, model)
+        self.user_factors = None
+        self.item_factors = None
+        self.regularization = settings.RECOMMENDER_ALS_REGULARIZATION
+        self.alpha = settings.RECOMMENDER_ALS_ALPHA
+    
+    def calculate_factors(
+        self,
+        factors: Optional[int] = None,
+        iterations: Optional[int] = None,
+        regularization: Optional[float] = None,
+        alpha: Optional[float] = None,
+        cg_steps: int = 3,
+        seed: int = 0
+    ):
+        """
+        交替最小二乘训练用户/商品因子
+        
+        Args:
+            factors: 因子数，默认读取配置 RECOMMENDER_ALS_FACTORS
+            iterations: 交替迭代轮数，默认读取配置 RECOMMENDER_ALS_ITERATIONS
+            regularization: 正则化系数，默认读取配置 RECOMMENDER_ALS_REGULARIZATION
+            alpha: 置信度系数，默认读取配置 RECOMMENDER_ALS_ALPHA
+            cg_steps: 每轮共轭梯度步数
+            seed: 因子初始化随机种子
+        
+        Returns:
+            (用户因子, 商品因子) 元组，数据不足时为None
+        """
+        factors = factors or settings.RECOMMENDER_ALS_FACTORS
+        iterations = iterations or settings.RECOMMENDER_ALS_ITERATIONS
+        if regularization is not None:
+            self.regularization = regularization
+        if alpha is not None:
+            self.alpha = alpha
+        
+        if self.user_item_matrix is None:
+            self.build_user_item_matrix(use_sparse=True)
+        
+        if self.user_item_matrix is None or self.user_item_matrix.shape[0] == 0:
+            return None
+        
+        user_confidence = sparse.csr_matrix(self.user_item_matrix, dtype=np.float32) * np.float32(self.alpha)
+        item_confidence = user_confidence.T.tocsr()
+        
+        rng = np.random.default_rng(seed)
+        n_users, n_items = user_confidence.shape
+        self.user_factors = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+        self.item_factors = (rng.standard_normal((n_items, factors)) * 0.01).astype(np.float32)
+        
+        for _ in range(iterations):
+            _least_squares_cg(user_confidence, self.user_factors, self.item_factors, self.regularization, cg_steps)
+            _least_squares_cg(item_confidence, self.item_factors, self.user_factors, self.regularization, cg_steps)
+        
+        return self.user_factors, self.item_factors
+    
+    def train(self) -> ALSModel:
+        """
+        训练并导出模型快照
+        
+        Returns:
+            模型快照（无订单数据时为空模型）
+        """
+        # 已训练过因子时直接复用
+        if self.item_factors is None and self.calculate_factors() is None:
+            return ALSModel(None, None, None, None, version=_new_version(), built_at=datetime.now())
+        
+        return ALSModel(
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            user_factors=self.user_factors,
+            item_factors=self.item_factors,
+            version=_new_version(),
+            built_at=datetime.now(),
+            regularization=self.regularization,
+            alpha=self.alpha
+        )
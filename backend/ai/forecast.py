@@ -0,0 +1,275 @@
+"""
+销量预测模块
+对商品日销量序列拟合指数平滑模型（Holt线性趋势 / Holt-Winters周季节性），
+预测售罄天数与建议补货量；所有商品按矩阵一次计算
+"""
+import math
+import numpy as np
+from datetime import date, timedelta
+from itertools import product as grid_product
+from typing import Iterable, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import DailyProductSales
+
+# 季节周期（天）
+SEASON_LENGTH = 7
+
+# 平滑参数候选值，逐商品选择一步预测误差平方和最小的组合
+_ALPHAS = (0.1, 0.3, 0.5)
+_BETAS = (0.01, 0.1)
+_GAMMAS = (0.05, 0.2)
+
+# 趋势阻尼系数，避免长期预测时趋势无限外推
+_DAMPING = 0.9
+
+
+class SalesForecast:
+    """
+    一组商品的销量预测结果
+    
+    Attributes:
+        product_ids: 商品ID数组
+        daily_forecast: 未来每天的预测销量，形状 (商品数, 预测天数)
+        residual_std: 拟合残差标准差（件/天）
+    """
+    
+    def __init__(self, product_ids: np.ndarray, daily_forecast: np.ndarray, residual_std: np.ndarray):
+        self.product_ids = product_ids
+        self.daily_forecast = daily_forecast
+        self.residual_std = residual_std
+        self.index = {int(product_id): row for row, product_id in enumerate(product_ids)}
+    
+    def select(self, product_ids: Iterable[int]) -> Tuple["SalesForecast", np.ndarray]:
+        """
+        取出部分商品的预测结果
+        
+        Args:
+            product_ids: 商品ID
+        
+        Returns:
+            (这些商品中有预测结果的子集，每个商品是否有预测结果的布尔数组)
+        """
+        rows = np.array([self.index.get(int(product_id), -1) for product_id in product_ids], dtype=np.int64)
+        found = rows >= 0
+        rows = rows[found]
+        return SalesForecast(self.product_ids[rows], self.daily_forecast[rows], self.residual_std[rows]), found
+    
+    def stockout_days(self, stock: np.ndarray) -> np.ndarray:
+        """
+        预计售罄天数：累计预测销量首次达到库存的那一天，预测期内不会售罄时为预测天数
+        
+        Args:
+            stock: 与 product_ids 对应的当前库存
+        
+        Returns:
+            售罄天数（整数）
+        """
+        horizon = self.daily_forecast.shape[1]
+        cumulative = np.cumsum(self.daily_forecast, axis=1)
+        reached = cumulative >= stock[:, None]
+        days = np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, horizon)
+        return np.where(stock > 0, days, 0).astype(np.int64)
+    
+    def reorder_quantity(
+        self,
+        stock: np.ndarray,
+        lead_days: int,
+        cover_days: int,
+        service_z: float
+    ) -> np.ndarray:
+        """
+        建议补货量：到货前及到货后覆盖期内的预测需求加安全库存，减去当前库存
+        
+        Args:
+            stock: 与 product_ids 对应的当前库存
+            lead_days: 补货到货天数
+            cover_days: 补货需覆盖的天数
+            service_z: 服务水平对应的正态分位数
+        
+        Returns:
+            建议补货量（整数，不小于0）
+        """
+        days = min(lead_days + cover_days, self.daily_forecast.shape[1])
+        demand = self.daily_forecast[:, :days].sum(axis=1)
+        safety = service_z * self.residual_std * math.sqrt(days)
+        return np.maximum(np.ceil(demand + safety - stock), 0).astype(np.int64)
+
+
+def load_daily_sales(
+    db: Session,
+    end_day: date,
+    days: int,
+    merchant_id: Optional[int] = None,
+    product_ids: Optional[Iterable[int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    从日销量汇总表读取 (商品, 日期) 日销量矩阵
+    
+    Args:
+        db: 数据库会话
+        end_day: 序列最后一天的次日（不含当天）
+        days: 序列天数
+        merchant_id: 商家ID，None表示所有商家
+        product_ids: 只加载这些商品，None表示不限
+    
+    Returns:
+        (商品ID数组, 日销量矩阵 (商品数, 天数))，只包含期间内有销量的商品
+    """
+    start_day = end_day - timedelta(days=days)
+    query = db.query(
+        DailyProductSales.product_id, DailyProductSales.sale_date, DailyProductSales.quantity
+    ).filter(
+        DailyProductSales.sale_date >= start_day,
+        DailyProductSales.sale_date < end_day
+    )
+    if merchant_id is not None:
+        query = query.filter(DailyProductSales.merchant_id == merchant_id)
+    if product_ids is not None:
+        query = query.filter(DailyProductSales.product_id.in_(list(product_ids)))
+    rows = query.all()
+    
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, days))
+    
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    offsets = np.array([(row[1] - start_day).days for row in rows], dtype=np.int64)
+    quantities = np.array([float(row[2] or 0) for row in rows])
+    
+    unique_ids, rows_index = np.unique(ids, return_inverse=True)
+    series = np.zeros((len(unique_ids), days))
+    np.add.at(series, (rows_index, offsets), quantities)
+    return unique_ids, series
+
+
+def fit_exponential_smoothing(series: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    对每一行序列拟合阻尼趋势的指数平滑模型并预测
+    
+    序列覆盖至少两个季节周期时使用加法季节性的 Holt-Winters，否则使用 Holt 线性趋势。
+    所有商品与所有参数组合同时迭代，逐商品选择一步预测误差最小的参数
+    
+    Args:
+        series: 日销量矩阵 (商品数, 天数)
+        horizon: 预测天数
+    
+    Returns:
+        (每日预测销量 (商品数, horizon)，残差标准差 (商品数,))
+    """
+    n_series, length = series.shape
+    seasonal = length >= 2 * SEASON_LENGTH
+    gammas = _GAMMAS if seasonal else (0.0,)
+    params = np.array(list(grid_product(_ALPHAS, _BETAS, gammas)))
+    alpha, beta, gamma = (params[:, column][:, None] for column in range(3))
+    n_params = len(params)
+    
+    # 初始化：首个周期的均值为水平，前两个周期均值之差为趋势，首个周期相对水平的偏差为季节项
+    if seasonal:
+        first = series[:, :SEASON_LENGTH]
+        level0 = first.mean(axis=1)
+        trend0 = (series[:, SEASON_LENGTH:2 * SEASON_LENGTH].mean(axis=1) - level0) / SEASON_LENGTH
+        season0 = first - level0[:, None]
+    else:
+        level0 = series[:, 0]
+        trend0 = series[:, 1] - series[:, 0] if length > 1 else np.zeros(n_series)
+        season0 = np.zeros((n_series, SEASON_LENGTH))
+    
+    level = np.broadcast_to(level0, (n_params, n_series)).copy()
+    trend = np.broadcast_to(trend0, (n_params, n_series)).copy()
+    season = np.broadcast_to(season0, (n_params, n_series, SEASON_LENGTH)).copy()
+    sse = np.zeros((n_params, n_series))
+    
+    for t in range(length):
+        observed = series[:, t]
+        slot = t % SEASON_LENGTH
+        previous_season = season[:, :, slot]
+        damped_trend = _DAMPING * trend
+        error = observed - (level + damped_trend + previous_season)
+        sse += error * error
+        
+        new_level = alpha * (observed - previous_season) + (1 - alpha) * (level + damped_trend)
+        trend = beta * (new_level - level) + (1 - beta) * damped_trend
+        season[:, :, slot] = gamma * (observed - new_level) + (1 - gamma) * previous_season
+        level = new_level
+    
+    best = sse.argmin(axis=0)
+    columns = np.arange(n_series)
+    level, trend, season = level[best, columns], trend[best, columns], season[best, columns]
+    
+    steps = np.arange(1, horizon + 1)
+    damping_sum = np.cumsum(_DAMPING ** steps)
+    slots = (length + steps - 1) % SEASON_LENGTH
+    forecast = level[:, None] + damping_sum[None, :] * trend[:, None] + season[:, slots]
+    residual_std = np.sqrt(sse[best, columns] / max(length, 1))
+    return np.maximum(forecast, 0), residual_std
+
+
+def forecast_sales(
+    db: Session,
+    merchant_id: Optional[int] = None,
+    product_ids: Optional[Iterable[int]] = None,
+    day: Optional[date] = None
+) -> SalesForecast:
+    """
+    为商家（或指定商品）预测未来日销量
+    
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID，None表示所有商家
+        product_ids: 只预测这些商品，None表示不限
+        day: 预测起始日（序列截止到前一天），默认今天
+    
+    Returns:
+        预测结果，只包含历史期内有销量的商品
+    """
+    day = day or date.today()
+    ids, series = load_daily_sales(
+        db, day, settings.ADVISOR_FORECAST_HISTORY_DAYS, merchant_id, product_ids
+    )
+    horizon = settings.ADVISOR_FORECAST_HORIZON_DAYS
+    if len(ids) == 0:
+        return SalesForecast(ids, np.empty((0, horizon)), np.empty(0))
+    daily_forecast, residual_std = fit_exponential_smoothing(series, horizon)
+    return SalesForecast(ids, daily_forecast, residual_std)
+
+
+def stockout_metrics(
+    forecast: Optional[SalesForecast],
+    product_ids: np.ndarray,
+    stock: np.ndarray,
+    monthly_sales: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算一组商品的预计售罄天数与建议补货量
+    
+    没有预测结果（未开启预测或无历史销量）的商品按近30天日均销量估算
+    
+    Args:
+        forecast: 预测结果，None表示按近30天日均销量估算全部商品
+        product_ids: 商品ID
+        stock: 当前库存
+        monthly_sales: 近30天销量
+    
+    Returns:
+        (售罄天数, 建议补货量)
+    """
+    horizon = settings.ADVISOR_FORECAST_HORIZON_DAYS
+    lead_days = settings.ADVISOR_REORDER_LEAD_DAYS
+    cover_days = settings.ADVISOR_REORDER_COVER_DAYS
+    
+    # 平均日销量估算
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_rate = monthly_sales / 30
+        days = np.where(daily_rate > 0, np.trunc(stock / np.where(daily_rate > 0, daily_rate, 1)), horizon)
+    days = np.where(stock > 0, np.minimum(days, horizon), 0).astype(np.int64)
+    reorder = np.maximum(np.ceil(daily_rate * (lead_days + cover_days) - stock), 0).astype(np.int64)
+    
+    if forecast is not None and len(forecast.product_ids):
+        subset, found = forecast.select(product_ids)
+        if found.any():
+            days[found] = subset.stockout_days(stock[found])
+            reorder[found] = subset.reorder_quantity(
+                stock[found], lead_days, cover_days, settings.ADVISOR_REORDER_SERVICE_Z
+            )
+    return days, reorder
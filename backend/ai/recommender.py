@@ -2,13 +2,417 @@
 协同过滤推荐引擎
 基于物品的协同过滤算法（Item-Based Collaborative Filtering）
 """
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
 import pandas as pd
-from typing import List, Dict
+from scipy import sparse
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Iterable, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 
-from models import Order, Product, Merchant
+from config import settings
+from models import Order, Product, Merchant, UserRecommendation
+
+# 分块计算相似度时单个块的最大元素数（float32约64MB）
+_SIMILARITY_BLOCK_CELLS = 1 << 24
+
+
+# 模型目录中指向当前版本的指针文件
+_CURRENT_POINTER = "CURRENT"
+
+
+def _new_version() -> str:
+    """生成模型版本号（时间戳）"""
+    return datetime.now().strftime("%Y%m%d%H%M%S%f")
+
+
+def read_current_version(directory: str) -> Optional[str]:
+    """
+    读取模型目录中当前发布的版本号
+    
+    Args:
+        directory: 模型根目录
+        
+    Returns:
+        版本号，尚未发布过模型时返回None
+    """
+    try:
+        with open(os.path.join(directory, _CURRENT_POINTER), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_model_files(
+    directory: str,
+    version: str,
+    built_at: datetime,
+    kind: str,
+    arrays: Dict[str, np.ndarray]
+) -> str:
+    """
+    将模型数组保存为 .npy 文件并发布为当前版本
+    先写入临时目录再重命名，最后原子替换 CURRENT 指针文件，
+    其他进程任何时刻读到的都是完整的版本
+    
+    Args:
+        directory: 模型根目录
+        version: 模型版本号
+        built_at: 训练完成时间
+        kind: 模型类型（itemcf / als）
+        arrays: 名称 -> 数组，为空表示空模型
+        
+    Returns:
+        本版本的模型目录
+    """
+    target = os.path.join(directory, version)
+    staging = target + ".tmp"
+    os.makedirs(staging, exist_ok=True)
+    
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+    
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "built_at": built_at.isoformat(), "kind": kind, "empty": not arrays}, f)
+    
+    os.replace(staging, target)
+    
+    pointer = os.path.join(directory, _CURRENT_POINTER)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    return target
+
+
+def load_model(directory: str, version: Optional[str] = None):
+    """
+    以内存映射方式加载已发布的模型，同一台机器上的多个工作进程共享同一份页缓存
+    
+    Args:
+        directory: 模型根目录
+        version: 模型版本号，默认读取 CURRENT 指针
+        
+    Returns:
+        模型快照（数组为只读 numpy.memmap），类型由 meta.json 中的 kind 决定
+    """
+    version = version or read_current_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"模型目录中没有已发布的版本: {directory}")
+    
+    path = os.path.join(directory, version)
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    
+    arrays = {
+        name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode="r")
+        for name in os.listdir(path) if name.endswith(".npy")
+    }
+    
+    model_class = RecommendationModel
+    if meta.get("kind") == "als":
+        from ai.als import ALSModel
+        model_class = ALSModel
+    return model_class.from_files(version, datetime.fromisoformat(meta["built_at"]), meta, arrays)
+
+
+def lookup_indices(sorted_ids: Optional[np.ndarray], ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    在升序排列的ID数组中二分查找ID的下标
+    模型的ID数组来自 np.unique，本身有序，无需在每个进程中另建 ID -> 下标 字典
+    
+    Args:
+        sorted_ids: 升序排列的ID数组（可为只读 numpy.memmap），None表示空
+        ids: 待查找的ID
+        
+    Returns:
+        (下标数组, 是否找到的布尔数组)，未找到的ID对应的下标无意义
+    """
+    ids = np.fromiter(ids, dtype=np.int64) if not isinstance(ids, np.ndarray) else ids.astype(np.int64, copy=False)
+    if sorted_ids is None or len(sorted_ids) == 0:
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return positions, sorted_ids[positions] == ids
+
+
+def _remove_old_versions(directory: str, keep: int):
+    """
+    清理旧版本模型目录，仅保留最近的 keep 个版本
+    仍被其他进程映射的文件在部分系统上无法删除，忽略删除失败
+    
+    Args:
+        directory: 模型根目录
+        keep: 保留的版本数
+    """
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name)) and not name.endswith(".tmp")
+    )
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+class RecommendationModel:
+    """
+    推荐模型快照
+    训练完成后只读，由 ModelRegistry 整体替换，可在多个请求间共享
+    
+    每个商品只保存相似度最高的K个近邻（下标与分数），
+    模型大小为 商品数×K，而非 商品数×商品数
+    
+    增量更新得到的近邻行保存在按商品ID索引的覆盖层中，计算推荐时优先于基础数组，
+    基础数组（可能是内存映射）在版本之间共享，不随每次合并复制
+    """
+    
+    kind = "itemcf"
+    
+    def __init__(
+        self,
+        item_ids: Optional[np.ndarray],
+        neighbor_idx: Optional[np.ndarray],
+        neighbor_scores: Optional[np.ndarray],
+        version: str,
+        built_at: datetime,
+        similarity_matrix: Optional[sparse.csr_matrix] = None,
+        patches: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]] = None
+    ):
+        """
+        初始化模型快照
+        
+        Args:
+            item_ids: 矩阵下标对应的商品ID，升序排列（数据不足时为None）
+            neighbor_idx: 近邻下标，形状为(商品数, K)，不足K个时以-1填充
+            neighbor_scores: 近邻相似度，形状为(商品数, K)，按相似度降序排列
+            version: 模型版本号
+            built_at: 训练完成时间
+            similarity_matrix: 由近邻数组构建的稀疏相似度矩阵（为None时自动构建）
+            patches: 覆盖层，商品ID -> (近邻商品ID数组, 相似度数组)
+        """
+        self.item_ids = item_ids
+        self.neighbor_idx = neighbor_idx
+        self.neighbor_scores = neighbor_scores
+        self.version = version
+        self.built_at = built_at
+        if similarity_matrix is None and item_ids is not None:
+            similarity_matrix = self._build_similarity_matrix()
+        self.similarity_matrix = similarity_matrix
+        self.patches = patches or {}
+    
+    @property
+    def is_empty(self) -> bool:
+        """模型是否因数据不足而为空"""
+        return self.item_ids is None and not self.patches
+    
+    def save(self, directory: str) -> str:
+        """
+        将模型保存为 .npy 文件并发布为当前版本
+        
+        Args:
+            directory: 模型根目录
+            
+        Returns:
+            本版本的模型目录
+        """
+        arrays = {}
+        if self.item_ids is not None:
+            arrays = {
+                "item_ids": self.item_ids,
+                "neighbor_idx": self.neighbor_idx,
+                "neighbor_scores": self.neighbor_scores,
+                "similarity_data": self.similarity_matrix.data,
+                "similarity_indices": self.similarity_matrix.indices,
+                "similarity_indptr": self.similarity_matrix.indptr,
+            }
+        return write_model_files(directory, self.version, self.built_at, self.kind, arrays)
+    
+    @classmethod
+    def from_files(cls, version: str, built_at: datetime, meta: Dict, arrays: Dict[str, np.ndarray]) -> "RecommendationModel":
+        """
+        由内存映射的模型文件还原模型快照
+        
+        Args:
+            version: 模型版本号
+            built_at: 训练完成时间
+            meta: meta.json 内容
+            arrays: 名称 -> 只读 numpy.memmap
+            
+        Returns:
+            模型快照
+        """
+        if meta["empty"]:
+            return cls(None, None, None, version=version, built_at=built_at)
+        
+        item_ids = arrays["item_ids"]
+        similarity_matrix = sparse.csr_matrix(
+            (arrays["similarity_data"], arrays["similarity_indices"], arrays["similarity_indptr"]),
+            shape=(len(item_ids), len(item_ids)),
+            copy=False
+        )
+        return cls(
+            item_ids=item_ids,
+            neighbor_idx=arrays["neighbor_idx"],
+            neighbor_scores=arrays["neighbor_scores"],
+            version=version,
+            built_at=built_at,
+            similarity_matrix=similarity_matrix
+        )
+    
+    def _build_similarity_matrix(self) -> sparse.csr_matrix:
+        """
+        由近邻数组构建稀疏相似度矩阵（每行最多K个非零元素）
+        
+        Returns:
+            商品×商品稀疏矩阵
+        """
+        n_items = len(self.item_ids)
+        mask = self.neighbor_idx >= 0
+        indptr = np.zeros(n_items + 1, dtype=np.int64)
+        np.cumsum(mask.sum(axis=1), out=indptr[1:])
+        return sparse.csr_matrix(
+            (self.neighbor_scores[mask], self.neighbor_idx[mask], indptr),
+            shape=(n_items, n_items)
+        )
+    
+    def recommend(self, purchased_ids: Iterable[int], top_n: int, user_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        向量化计算推荐分数
+        用户购买向量与相似度矩阵相乘，屏蔽已购商品后用argpartition取Top N
+        
+        Args:
+            purchased_ids: 用户已购买的商品ID
+            top_n: 推荐数量
+            user_id: 用户ID（基于物品的模型只依赖购买记录，不使用该参数）
+            
+        Returns:
+            按分数降序排列的 (商品ID, 分数) 列表
+        """
+        if self.is_empty or top_n <= 0:
+            return []
+        purchased_ids = np.fromiter(purchased_ids, dtype=np.int64)
+        overlaid = np.isin(purchased_ids, list(self.patches)) if self.patches else np.zeros(len(purchased_ids), dtype=bool)
+        positions, found = lookup_indices(self.item_ids, purchased_ids[~overlaid])
+        purchased = positions[found]
+        if len(purchased) == 0 and not overlaid.any():
+            return []
+        
+        candidates, values = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(purchased) > 0:
+            # 稀疏购买向量 × 相似度矩阵，计算量与 已购商品数×K 成正比
+            user_vector = sparse.csr_matrix(
+                (np.ones(len(purchased), dtype=np.float32), (np.zeros(len(purchased), dtype=np.int64), purchased)),
+                shape=(1, len(self.item_ids))
+            )
+            scores = user_vector @ self.similarity_matrix
+            candidates, values = self.item_ids[scores.indices], scores.data
+        
+        if overlaid.any():
+            # 覆盖层中的近邻行按商品ID与基础矩阵的得分合并
+            rows = [self.patches[int(product_id)] for product_id in purchased_ids[overlaid]]
+            candidates, inverse = np.unique(
+                np.concatenate([candidates] + [neighbor_ids for neighbor_ids, _ in rows]),
+                return_inverse=True
+            )
+            values = np.bincount(
+                inverse,
+                weights=np.concatenate([values] + [neighbor_scores for _, neighbor_scores in rows]),
+                minlength=len(candidates)
+            ).astype(np.float32)
+        
+        # 屏蔽已购商品和零分商品
+        keep = (values > 0) & ~np.isin(candidates, purchased_ids)
+        candidates, values = candidates[keep], values[keep]
+        
+        if len(values) > top_n:
+            top = np.argpartition(-values, top_n - 1)[:top_n]
+            candidates, values = candidates[top], values[top]
+        order = np.argsort(-values, kind="stable")
+        
+        return [(int(product_id), float(score)) for product_id, score in zip(candidates[order], values[order])]
+    
+    def recommend_batch(
+        self,
+        user_ids: np.ndarray,
+        purchases: sparse.csr_matrix,
+        top_n: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        批量为多个用户计算推荐，整块只做一次稀疏矩阵乘法
+        
+        Args:
+            user_ids: 购买矩阵各行对应的用户ID
+            purchases: 用户购买矩阵（行为用户，列与模型商品下标一致，已购为1）
+            top_n: 每个用户的推荐数量
+            
+        Returns:
+            每个用户一项 (商品ID数组, 分数数组)，按分数降序排列
+        """
+        if self.patches:
+            # 覆盖层只在单用户路径中合并，逐个用户计算
+            results = []
+            for row in range(purchases.shape[0]):
+                start, end = purchases.indptr[row], purchases.indptr[row + 1]
+                recommended = self.recommend(self.item_ids[purchases.indices[start:end]], top_n)
+                results.append((
+                    np.array([product_id for product_id, _ in recommended], dtype=np.int64),
+                    np.array([score for _, score in recommended], dtype=np.float32)
+                ))
+            return results
+        
+        scores = (purchases @ self.similarity_matrix).tocsr()
+        
+        # 屏蔽已购商品：减去已购位置上的分数后剔除零元素
+        scores = (scores - scores.multiply(purchases > 0)).tocsr()
+        scores.eliminate_zeros()
+        
+        results = []
+        for row in range(scores.shape[0]):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            candidates, values = scores.indices[start:end], scores.data[start:end]
+            keep = values > 0
+            candidates, values = candidates[keep], values[keep]
+            if len(values) > top_n:
+                top = np.argpartition(-values, top_n - 1)[:top_n]
+                candidates, values = candidates[top], values[top]
+            order = np.argsort(-values, kind="stable")
+            results.append((self.item_ids[candidates[order]], values[order]))
+        
+        return results
+    
+    def patched(self, rows: Dict[int, Tuple[List[int], List[float]]]) -> "RecommendationModel":
+        """
+        替换部分商品的近邻行，生成新版本的模型快照（原快照保持不变）
+        新版本与原快照共享基础数组，只复制覆盖层，开销与被替换的行数成正比
+        
+        Args:
+            rows: 商品ID -> (近邻商品ID列表, 相似度列表)，已按相似度降序排列
+            
+        Returns:
+            新的模型快照
+        """
+        top_k = max(settings.RECOMMENDER_TOP_K, self.neighbor_idx.shape[1] if self.neighbor_idx is not None else 0)
+        patches = dict(self.patches)
+        for product_id, (neighbor_ids, scores) in rows.items():
+            patches[int(product_id)] = (
+                np.asarray(neighbor_ids[:top_k], dtype=np.int64),
+                np.asarray(scores[:top_k], dtype=np.float32)
+            )
+        
+        return RecommendationModel(
+            item_ids=self.item_ids,
+            neighbor_idx=self.neighbor_idx,
+            neighbor_scores=self.neighbor_scores,
+            version=_new_version(),
+            built_at=datetime.now(),
+            similarity_matrix=self.similarity_matrix,
+            patches=patches
+        )
 
 
 class RecommendationEngine:
@@ -17,27 +421,54 @@ class RecommendationEngine:
     实现基于物品的协同过滤算法
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, model: Optional[RecommendationModel] = None):
         """
         初始化推荐引擎
         
         Args:
             db: 数据库会话
+            model: 已训练的模型快照（为None时按需现场训练）
         """
         self.db = db
+        self.model = model
         self.user_item_matrix = None
-        self.item_similarity = None
+        self.user_ids = None
+        self.item_ids = None
+        self.neighbor_idx = None
+        self.neighbor_scores = None
+        # 构建矩阵时读取到的最大订单ID（快照边界）
+        self.last_order_id = 0
+        # 时间衰减的半衰期（天）与计算权重的参考时刻，未衰减时参考时刻为None
+        self.decay_half_life_days = 0.0
+        self.decay_reference: Optional[datetime] = None
     
-    def build_user_item_matrix(self):
+    def build_user_item_matrix(self, use_sparse: Optional[bool] = None):
         """
         构建用户-商品评分矩阵
         使用购买次数作为隐式评分
+        
+        Args:
+            use_sparse: 是否构建稀疏矩阵，默认读取配置 RECOMMENDER_SPARSE_MATRIX
         """
-        # 查询所有订单数据
+        if use_sparse is None:
+            use_sparse = settings.RECOMMENDER_SPARSE_MATRIX
+        
+        # 时间衰减需要逐条订单的下单时间，走流式构建；稠密模式下再转为稠密矩阵
+        if settings.RECOMMENDER_DECAY_HALF_LIFE_DAYS > 0 or (use_sparse and settings.RECOMMENDER_STREAMING_BUILD):
+            matrix = self.build_streaming_matrix()
+            if matrix is None or use_sparse:
+                return matrix
+            self.user_item_matrix = matrix.toarray()
+            return self.user_item_matrix
+        
+        # 以当前最大订单ID为快照边界，查询此前的所有订单数据
+        self.last_order_id = self.db.query(func.max(Order.order_id)).scalar() or 0
         orders = self.db.query(
             Order.user_id,
             Order.product_id,
             func.count(Order.order_id).label('purchase_count')
+        ).filter(
+            Order.order_id <= self.last_order_id
         ).group_by(
             Order.user_id, Order.product_id
         ).all()
@@ -45,6 +476,14 @@ class RecommendationEngine:
         if not orders:
             return None
         
+        if use_sparse:
+            count = len(orders)
+            return self.build_matrix_from_arrays(
+                np.fromiter((order.user_id for order in orders), dtype=np.int64, count=count),
+                np.fromiter((order.product_id for order in orders), dtype=np.int64, count=count),
+                np.fromiter((order.purchase_count for order in orders), dtype=np.float32, count=count)
+            )
+        
         # 转换为DataFrame
         data = [
             {"user_id": order.user_id, "product_id": order.product_id, "rating": order.purchase_count}
@@ -60,35 +499,184 @@ class RecommendationEngine:
             fill_value=0
         )
         
+        self.user_ids = matrix.index.to_numpy()
+        self.item_ids = matrix.columns.to_numpy()
+        self.user_item_matrix = matrix.to_numpy()
+        return self.user_item_matrix
+    
+    def build_streaming_matrix(
+        self,
+        chunk_size: Optional[int] = None,
+        half_life_days: Optional[float] = None
+    ) -> Optional[sparse.csr_matrix]:
+        """
+        流式构建用户-商品矩阵
+        通过服务端游标按块读取订单，直接写入预分配的numpy数组，峰值内存与订单数成正比
+        且不经过Python对象列表；每条订单按下单时间做指数衰减加权，半衰期后权重减半
+        
+        Args:
+            chunk_size: 每次从游标读取的行数，默认读取配置 RECOMMENDER_STREAM_CHUNK_SIZE
+            half_life_days: 衰减半衰期（天），0表示不衰减，默认读取配置 RECOMMENDER_DECAY_HALF_LIFE_DAYS
+            
+        Returns:
+            用户-商品稀疏矩阵，无订单时为None
+        """
+        chunk_size = chunk_size or settings.RECOMMENDER_STREAM_CHUNK_SIZE
+        if half_life_days is None:
+            half_life_days = settings.RECOMMENDER_DECAY_HALF_LIFE_DAYS
+        
+        # 以当前最大订单ID为快照边界，保证计数与流式读取的行数一致
+        max_order_id, total = self.db.query(
+            func.max(Order.order_id),
+            func.count(Order.order_id)
+        ).one()
+        if not total:
+            return None
+        self.last_order_id = max_order_id
+        
+        user_ids = np.empty(total, dtype=np.int64)
+        product_ids = np.empty(total, dtype=np.int64)
+        weights = np.ones(total, dtype=np.float32)
+        reference = datetime.now().replace(microsecond=0)
+        now = np.datetime64(reference, "s")
+        if half_life_days > 0:
+            self.decay_half_life_days = half_life_days
+            self.decay_reference = reference
+        
+        result = self.db.execute(
+            select(Order.user_id, Order.product_id, Order.order_time).where(
+                Order.order_id <= max_order_id
+            ).execution_options(yield_per=chunk_size)
+        )
+        
+        filled = 0
+        for rows in result.partitions():
+            count = min(len(rows), total - filled)
+            end = filled + count
+            user_ids[filled:end] = np.fromiter((row[0] for row in rows[:count]), dtype=np.int64, count=count)
+            product_ids[filled:end] = np.fromiter((row[1] for row in rows[:count]), dtype=np.int64, count=count)
+            
+            if half_life_days > 0:
+                order_times = np.array([row[2] for row in rows[:count]], dtype="datetime64[s]")
+                # 缺失下单时间的按当前时间计（权重为1）
+                order_times[np.isnat(order_times)] = now
+                age_days = (now - order_times).astype(np.float64) / 86400
+                weights[filled:end] = np.power(0.5, np.maximum(age_days, 0) / half_life_days)
+            
+            filled = end
+        result.close()
+        
+        return self.build_matrix_from_arrays(user_ids[:filled], product_ids[:filled], weights[:filled])
+    
+    def build_matrix_from_arrays(
+        self,
+        user_ids: np.ndarray,
+        product_ids: np.ndarray,
+        ratings: np.ndarray
+    ) -> sparse.csr_matrix:
+        """
+        由 (user_id, product_id, rating) 数组直接构建稀疏CSR矩阵
+        内存占用与购买记录数成正比，而非用户数×商品数；
+        同一 (用户, 商品) 出现多次时评分累加
+        
+        Args:
+            user_ids: 用户ID数组
+            product_ids: 商品ID数组
+            ratings: 隐式评分数组
+            
+        Returns:
+            用户-商品稀疏矩阵
+        """
+        # ID映射为连续下标
+        self.user_ids, user_index = np.unique(user_ids, return_inverse=True)
+        self.item_ids, item_index = np.unique(product_ids, return_inverse=True)
+        
+        matrix = sparse.csr_matrix(
+            (np.asarray(ratings, dtype=np.float32), (user_index, item_index)),
+            shape=(len(self.user_ids), len(self.item_ids))
+        )
+        matrix.sum_duplicates()
+        
         self.user_item_matrix = matrix
         return matrix
     
-    def calculate_item_similarity(self):
+    def calculate_item_neighbors(self, top_k: Optional[int] = None):
         """
-        计算商品相似度矩阵
-        使用余弦相似度
+        计算每个商品的Top-K相似商品
+        使用余弦相似度，按行分块计算相似度，任意时刻只保留一个块，
+        避免生成完整的 商品数×商品数 矩阵
+        
+        Args:
+            top_k: 每个商品保留的近邻数量，默认读取配置 RECOMMENDER_TOP_K
+            
+        Returns:
+            (近邻下标, 近邻相似度) 元组，数据不足时为None
         """
+        if top_k is None:
+            top_k = settings.RECOMMENDER_TOP_K
+        
         if self.user_item_matrix is None:
             self.build_user_item_matrix()
         
         if self.user_item_matrix is None or self.user_item_matrix.shape[0] == 0:
             return None
         
-        # 转置矩阵（商品为行，用户为列）
-        item_matrix = self.user_item_matrix.T
+        # 转置矩阵（商品为行，用户为列）并按行归一化，归一化后的内积即余弦相似度
+        from sklearn.preprocessing import normalize
+        item_matrix = normalize(self.user_item_matrix.T.astype(np.float32))
+        if sparse.issparse(item_matrix):
+            item_matrix = item_matrix.tocsr()
         
-        # 计算余弦相似度
-        from sklearn.metrics.pairwise import cosine_similarity
-        similarity = cosine_similarity(item_matrix)
+        n_items = item_matrix.shape[0]
+        top_k = max(0, min(top_k, n_items - 1))
+        neighbor_idx = np.full((n_items, top_k), -1, dtype=np.int32)
+        neighbor_scores = np.zeros((n_items, top_k), dtype=np.float32)
         
-        # 转换为DataFrame
-        self.item_similarity = pd.DataFrame(
-            similarity,
-            index=item_matrix.index,
-            columns=item_matrix.index
-        )
+        if top_k > 0:
+            block_size = max(1, _SIMILARITY_BLOCK_CELLS // n_items)
+            for start in range(0, n_items, block_size):
+                end = min(start + block_size, n_items)
+                block = item_matrix[start:end] @ item_matrix.T
+                block = block.toarray() if sparse.issparse(block) else np.asarray(block)
+                
+                # 排除商品自身
+                rows = np.arange(end - start)
+                block[rows, rows + start] = 0
+                
+                # 每行取Top-K后再按相似度降序排列
+                top = np.argpartition(-block, top_k - 1, axis=1)[:, :top_k]
+                scores = np.take_along_axis(block, top, axis=1)
+                order = np.argsort(-scores, axis=1, kind="stable")
+                top = np.take_along_axis(top, order, axis=1)
+                scores = np.take_along_axis(scores, order, axis=1)
+                
+                # 相似度为0的不算近邻
+                top[scores <= 0] = -1
+                scores[scores <= 0] = 0
+                neighbor_idx[start:end] = top
+                neighbor_scores[start:end] = scores
         
-        return self.item_similarity
+        self.neighbor_idx = neighbor_idx
+        self.neighbor_scores = neighbor_scores
+        return neighbor_idx, neighbor_scores
+    
+    def train(self) -> RecommendationModel:
+        """
+        训练并导出模型快照
+        
+        Returns:
+            模型快照（无订单数据时为空模型）
+        """
+        # 已计算过近邻时直接复用
+        if self.neighbor_idx is None and self.calculate_item_neighbors() is None:
+            self.item_ids = None
+        return RecommendationModel(
+            item_ids=self.item_ids,
+            neighbor_idx=self.neighbor_idx,
+            neighbor_scores=self.neighbor_scores,
+            version=_new_version(),
+            built_at=datetime.now()
+        )
     
     def get_user_recommendations(self, user_id: int, top_n: int = 10) -> List[Dict]:
         """
@@ -101,12 +689,13 @@ class RecommendationEngine:
         Returns:
             推荐商品列表
         """
-        # 构建相似度矩阵
-        if self.item_similarity is None:
-            self.calculate_item_similarity()
+        # 构建相似度矩阵（已加载模型快照时直接复用）
+        if self.model is None:
+            self.model = self.train()
+        model = self.model
         
         # 如果数据不足，返回热门商品
-        if self.item_similarity is None:
+        if model.is_empty:
             return self._get_hot_products(top_n)
         
         # 查询用户已购买的商品
@@ -114,61 +703,55 @@ class RecommendationEngine:
             Order.user_id == user_id
         ).distinct().all()
         
-        purchased_items = [order.product_id for order in user_orders]
+        purchased_items = {order.product_id for order in user_orders}
         
         if not purchased_items:
             # 新用户，返回热门商品
             return self._get_hot_products(top_n)
         
         # 计算推荐分数
-        recommendations = {}
+        sorted_recommendations = model.recommend(purchased_items, top_n, user_id=user_id)
         
-        for item_id in purchased_items:
-            if item_id not in self.item_similarity.columns:
-                continue
+        return self._build_recommendations(sorted_recommendations, top_n)
+    
+    def get_precomputed_recommendations(self, user_id: int, top_n: int = 10) -> Optional[List[Dict]]:
+        """
+        读取离线预计算的推荐结果
+        
+        Args:
+            user_id: 用户ID
+            top_n: 推荐数量
             
-            # 获取与该商品相似的商品
-            similar_items = self.item_similarity[item_id].sort_values(ascending=False)
+        Returns:
+            推荐商品列表，无预计算结果或结果已过期时返回None
+        """
+        stored = self.db.query(UserRecommendation).filter(
+            UserRecommendation.user_id == user_id
+        ).first()
+        
+        if not stored:
+            return None
+        
+        max_age = timedelta(hours=settings.RECOMMENDER_PRECOMPUTED_MAX_AGE_HOURS)
+        if stored.generated_at < datetime.now() - max_age:
+            return None
+        
+        product_ids = [int(item) for item in stored.product_ids.split(",") if item]
+        scores = [float(item) for item in stored.scores.split(",") if item]
+        return self._build_recommendations(list(zip(product_ids, scores))[:top_n], top_n)
+    
+    def _build_recommendations(self, scored: List[Tuple[int, float]], top_n: int) -> List[Dict]:
+        """
+        查询商品详情组装推荐结果，不足时补充热门商品
+        
+        Args:
+            scored: 按分数降序排列的 (商品ID, 分数) 列表
+            top_n: 推荐数量
             
-            for sim_item_id, similarity_score in similar_items.items():
-                # 跳过已购买的商品
-                if sim_item_id in purchased_items:
-                    continue
-                
-                # 累加相似度分数
-                if sim_item_id not in recommendations:
-                    recommendations[sim_item_id] = 0
-                recommendations[sim_item_id] += similarity_score
-        
-        # 排序并取Top N
-        sorted_recommendations = sorted(
-            recommendations.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:top_n]
-        
-        # 查询商品详情
-        result = []
-        for product_id, score in sorted_recommendations:
-            product = self.db.query(Product).filter(
-                Product.product_id == product_id,
-                Product.status == 1  # 仅上架商品
-            ).first()
-            
-            if product:
-                merchant = self.db.query(Merchant).filter(
-                    Merchant.merchant_id == product.merchant_id
-                ).first()
-                
-                result.append({
-                    "product_id": product.product_id,
-                    "name": product.name,
-                    "price": float(product.price),
-                    "category": product.category,
-                    "merchant_name": merchant.name if merchant else "未知商家",
-                    "reason": "基于您的购买历史推荐",
-                    "score": float(score)
-                })
+        Returns:
+            推荐商品列表
+        """
+        result = self._hydrate_products(scored, reason="基于您的购买历史推荐")
         
         # 如果推荐不足，补充热门商品
         if len(result) < top_n:
@@ -188,42 +771,639 @@ class RecommendationEngine:
         Returns:
             热门商品列表
         """
-        query = self.db.query(
-            Product,
-            func.sum(Order.quantity).label('sales')
-        ).join(
-            Order, Product.product_id == Order.product_id, isouter=True
-        ).filter(
+        # 按商品销量计数排序（可使用 idx_status_sales 索引），与热销商品接口一致，不含已取消订单
+        query = self.db.query(Product.product_id).filter(
             Product.status == 1
         )
         
         if exclude_ids:
             query = query.filter(~Product.product_id.in_(exclude_ids))
         
-        hot_products = query.group_by(
-            Product.product_id
-        ).order_by(
-            func.sum(Order.quantity).desc()
+        hot_products = query.order_by(
+            Product.sales_count.desc()
         ).limit(top_n).all()
         
+        return self._hydrate_products(
+            [(item.product_id, None) for item in hot_products],
+            reason="热门商品推荐"
+        )
+    
+    def _hydrate_products(self, scored: List[Tuple[int, Optional[float]]], reason: str) -> List[Dict]:
+        """
+        批量查询商品详情及商家名称（单次关联查询），按传入顺序组装结果
+        
+        Args:
+            scored: 按排序先后排列的 (商品ID, 分数) 列表，分数为None时结果中不含score字段
+            reason: 推荐理由
+            
+        Returns:
+            商品列表（已下架或不存在的商品被跳过）
+        """
+        if not scored:
+            return []
+        
+        rows = self.db.query(
+            Product.product_id,
+            Product.name,
+            Product.price,
+            Product.category,
+            Merchant.name.label('merchant_name')
+        ).outerjoin(
+            Merchant, Merchant.merchant_id == Product.merchant_id
+        ).filter(
+            Product.product_id.in_([product_id for product_id, _ in scored]),
+            Product.status == 1  # 仅上架商品
+        ).all()
+        products = {row.product_id: row for row in rows}
+        
         result = []
-        for product, sales in hot_products:
-            merchant = self.db.query(Merchant).filter(
-                Merchant.merchant_id == product.merchant_id
-            ).first()
+        for product_id, score in scored:
+            product = products.get(product_id)
+            if not product:
+                continue
             
-            result.append({
+            item = {
                 "product_id": product.product_id,
                 "name": product.name,
                 "price": float(product.price),
                 "category": product.category,
-                "merchant_name": merchant.name if merchant else "未知商家",
-                "reason": "热门商品推荐"
-            })
+                "merchant_name": product.merchant_name or "未知商家",
+                "reason": reason
+            }
+            if score is not None:
+                item["score"] = float(score)
+            result.append(item)
         
         return result
 
 
+def create_engine(db: Session) -> RecommendationEngine:
+    """
+    按配置 RECOMMENDER_BACKEND 创建推荐引擎
+    
+    Args:
+        db: 数据库会话
+        
+    Returns:
+        itemcf: 基于物品的协同过滤；als: 隐式反馈矩阵分解
+    """
+    if settings.RECOMMENDER_BACKEND == "als":
+        from ai.als import ALSRecommendationEngine
+        return ALSRecommendationEngine(db)
+    return RecommendationEngine(db)
+
+
+class IncrementalCooccurrence:
+    """
+    增量共现计数器
+    在内存中维护商品共现次数与商品向量范数，新订单到达时只更新相关计数，
+    并由计数直接重算受影响商品的余弦相似度近邻，无需全量重建矩阵
+    
+    余弦相似度 sim(i, j) = C[i][j] / sqrt(N[i] * N[j])，
+    其中 C[i][j] = Σ_u r_ui·r_uj，N[i] = Σ_u r_ui²，r_ui 为用户u购买商品i的次数
+    （开启时间衰减时为各次购买的衰减权重之和）
+    """
+    
+    def __init__(self, last_order_id: int = 0, half_life_days: float = 0.0, decay_reference: Optional[datetime] = None):
+        self.user_items: Dict[int, Dict[int, float]] = {}
+        self.cooccurrence: Dict[int, Dict[int, float]] = {}
+        self.norms_sq: Dict[int, float] = {}
+        self.dirty_items = set()
+        # 初始化计数所用的订单快照中的最大订单ID
+        self.last_order_id = last_order_id
+        # 快照中训练开始前后下单的订单ID，None表示只按最大订单ID判断
+        self.snapshot_order_ids: Optional[Set[int]] = None
+        # 与训练时相同的衰减半衰期与权重参考时刻
+        self.half_life_days = half_life_days
+        self.decay_reference = decay_reference
+    
+    @classmethod
+    def from_matrix(
+        cls,
+        matrix,
+        user_ids: np.ndarray,
+        item_ids: np.ndarray,
+        last_order_id: int = 0,
+        half_life_days: float = 0.0,
+        decay_reference: Optional[datetime] = None
+    ) -> "IncrementalCooccurrence":
+        """
+        由训练时构建的用户-商品矩阵初始化计数
+        
+        Args:
+            matrix: 用户-商品矩阵（稠密或稀疏）
+            user_ids: 矩阵行对应的用户ID
+            item_ids: 矩阵列对应的商品ID
+            last_order_id: 构建矩阵时读取到的最大订单ID
+            half_life_days: 构建矩阵时使用的衰减半衰期（天），0表示未衰减
+            decay_reference: 构建矩阵时计算衰减权重的参考时刻
+        
+        Returns:
+            计数器实例
+        """
+        tracker = cls(last_order_id, half_life_days, decay_reference)
+        if matrix is None:
+            return tracker
+        
+        matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        for row, user_id in enumerate(user_ids):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            tracker.user_items[int(user_id)] = {
+                int(item_ids[col]): float(value)
+                for col, value in zip(matrix.indices[start:end], matrix.data[start:end])
+            }
+        
+        # 共现矩阵 RᵀR 的对角线即范数平方
+        cooccurrence = (matrix.T @ matrix).tocsr()
+        for row, item_id in enumerate(item_ids):
+            start, end = cooccurrence.indptr[row], cooccurrence.indptr[row + 1]
+            counts = {}
+            for col, value in zip(cooccurrence.indices[start:end], cooccurrence.data[start:end]):
+                if col == row:
+                    tracker.norms_sq[int(item_id)] = float(value)
+                else:
+                    counts[int(item_ids[col])] = float(value)
+            tracker.cooccurrence[int(item_id)] = counts
+        
+        return tracker
+    
+    def covers_order(self, order_id: int) -> bool:
+        """
+        判断订单是否已计入初始化计数所用的快照
+        订单ID小于最大订单ID的订单也可能在快照之后才提交，有快照订单ID集合时按集合判断
+        
+        Args:
+            order_id: 订单ID
+        
+        Returns:
+            是否已计入
+        """
+        if order_id > self.last_order_id:
+            return False
+        return self.snapshot_order_ids is None or order_id in self.snapshot_order_ids
+    
+    def purchase_weight(self, purchased_at: Optional[datetime] = None) -> float:
+        """
+        计算一次购买的权重，与训练时以同一参考时刻按下单时间衰减
+        参考时刻之后的购买权重为 2^(经过天数/半衰期)；所有权重同比例缩放不改变余弦相似度，
+        因此增量更新的结果与在当前时刻全量重建一致
+        
+        Args:
+            purchased_at: 下单时间，默认为当前时间
+        
+        Returns:
+            购买权重，未开启衰减时为1
+        """
+        if self.half_life_days <= 0 or self.decay_reference is None:
+            return 1.0
+        elapsed_days = ((purchased_at or datetime.now()) - self.decay_reference).total_seconds() / 86400
+        return 0.5 ** (-elapsed_days / self.half_life_days)
+    
+    def add_purchase(self, user_id: int, product_id: int, purchased_at: Optional[datetime] = None):
+        """
+        记录一次购买并更新共现计数，计算量与该用户已购商品数成正比
+        
+        Args:
+            user_id: 用户ID
+            product_id: 商品ID
+            purchased_at: 下单时间，默认为当前时间
+        """
+        weight = self.purchase_weight(purchased_at)
+        items = self.user_items.setdefault(user_id, {})
+        rating = items.get(product_id, 0.0)
+        
+        # r_ui 增加权重w：C[i][j] 增加 w·r_uj，N[i] 增加 (r+w)² - r²
+        counts = self.cooccurrence.setdefault(product_id, {})
+        for other_id, other_rating in items.items():
+            if other_id == product_id:
+                continue
+            counts[other_id] = counts.get(other_id, 0.0) + weight * other_rating
+            other_counts = self.cooccurrence.setdefault(other_id, {})
+            other_counts[product_id] = other_counts.get(product_id, 0.0) + weight * other_rating
+            self.dirty_items.add(other_id)
+        
+        self.norms_sq[product_id] = self.norms_sq.get(product_id, 0.0) + 2 * rating * weight + weight * weight
+        items[product_id] = rating + weight
+        self.dirty_items.add(product_id)
+    
+    def neighbors(self, product_id: int, top_k: int) -> Tuple[List[int], List[float]]:
+        """
+        由共现计数重算单个商品的Top-K近邻
+        
+        Args:
+            product_id: 商品ID
+            top_k: 近邻数量
+            
+        Returns:
+            (近邻商品ID列表, 相似度列表)，按相似度降序排列
+        """
+        counts = self.cooccurrence.get(product_id)
+        norm_sq = self.norms_sq.get(product_id, 0.0)
+        if not counts or norm_sq <= 0:
+            return [], []
+        
+        other_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        other_norms = np.fromiter((self.norms_sq.get(int(item_id), 0.0) for item_id in other_ids), dtype=np.float64, count=len(counts))
+        scores = values / np.sqrt(norm_sq * np.maximum(other_norms, 1e-12))
+        
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            other_ids, scores = other_ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        keep = order[scores[order] > 0]
+        return [int(item_id) for item_id in other_ids[keep]], [float(score) for score in scores[keep]]
+    
+    def take_dirty_rows(self, top_k: int) -> Dict[int, Tuple[List[int], List[float]]]:
+        """
+        取出自上次调用以来受影响商品的最新近邻行
+        
+        Args:
+            top_k: 近邻数量
+            
+        Returns:
+            商品ID -> (近邻商品ID列表, 相似度列表)
+        """
+        rows = {item_id: self.neighbors(item_id, top_k) for item_id in self.dirty_items}
+        self.dirty_items = set()
+        return rows
+
+
+def _build_model(
+    db: Session,
+    since: Optional[datetime] = None
+) -> Tuple[str, Optional[RecommendationModel], Optional[IncrementalCooccurrence]]:
+    """
+    训练一个新版本模型；配置了模型目录时直接发布到磁盘
+    
+    Args:
+        db: 数据库会话
+        since: 增量模式下记录快照中该时刻（数据库时钟）之后下单的订单ID，供发布时判断训练期间的订单是否已计入
+        
+    Returns:
+        (版本号, 模型快照, 增量计数器)，已发布到磁盘时模型快照为None，由调用方按版本号映射
+    """
+    engine = create_engine(db)
+    model = engine.train()
+    tracker = None
+    # 增量共现计数只适用于基于物品的模型
+    if settings.RECOMMENDER_INCREMENTAL and isinstance(model, RecommendationModel):
+        tracker = IncrementalCooccurrence.from_matrix(
+            engine.user_item_matrix, engine.user_ids, engine.item_ids, engine.last_order_id,
+            engine.decay_half_life_days, engine.decay_reference
+        )
+        if since is not None:
+            # 与构建矩阵在同一事务内读取（可重复读隔离级别下为同一快照）
+            tracker.snapshot_order_ids = {
+                order_id for (order_id,) in db.query(Order.order_id).filter(
+                    Order.order_id <= engine.last_order_id,
+                    Order.order_time >= since
+                )
+            }
+    
+    model_dir = settings.RECOMMENDER_MODEL_DIR
+    if model_dir:
+        os.makedirs(model_dir, exist_ok=True)
+        model.save(model_dir)
+        _remove_old_versions(model_dir, settings.RECOMMENDER_MODEL_KEEP_VERSIONS)
+        return model.version, None, tracker
+    return model.version, model, tracker
+
+
+def _train_in_worker(
+    since: Optional[datetime] = None
+) -> Tuple[str, Optional[RecommendationModel], Optional[IncrementalCooccurrence]]:
+    """训练进程入口：使用独立的数据库会话训练模型"""
+    from database import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        return _build_model(db, since)
+    finally:
+        db.close()
+
+
+class ModelRegistry:
+    """
+    推荐模型注册表
+    持有当前生效的模型快照，训练出新版本后整体替换引用，
+    读取方无需加锁即可拿到一个完整的版本
+    
+    训练默认在独立的进程池中执行（RECOMMENDER_TRAIN_WORKERS），不占用请求线程；
+    同一时刻只有一次训练在进行，并发的刷新请求共享同一次训练的结果，
+    训练期间继续使用旧版本模型提供服务
+    
+    配置 RECOMMENDER_MODEL_DIR 后，训练结果发布到磁盘，各工作进程以内存映射方式
+    加载并定期检查 CURRENT 指针，发现新版本时重新映射
+    
+    开启增量模式（RECOMMENDER_INCREMENTAL）时，同时维护共现计数器，
+    新订单只更新计数，由 flush_incremental 定期把受影响的近邻行合并为新版本；
+    训练期间到达的订单另行缓存，新计数器替换旧计数器前按订单ID补记其快照中没有的订单
+    """
+    
+    def __init__(self):
+        self._model: Optional[RecommendationModel] = None
+        self._lock = threading.Lock()
+        self._pending: Optional[Future] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tracker: Optional[IncrementalCooccurrence] = None
+        self._tracker_lock = threading.Lock()
+        # 训练期间记录的订单 (订单ID, 用户ID, 商品ID, 下单时间)
+        self._recent_orders: List[Tuple[int, int, int, datetime]] = []
+        self._disk_version: Optional[str] = None
+        self._disk_built_at: Optional[datetime] = None
+        self._checked_at = 0.0
+    
+    @property
+    def model(self) -> Optional[RecommendationModel]:
+        """当前生效的模型快照"""
+        return self._model
+    
+    @property
+    def is_training(self) -> bool:
+        """是否有训练正在进行"""
+        return self._pending is not None
+    
+    def _start_training(self, db: Session) -> Future:
+        """
+        启动一次训练，已有训练在进行时直接返回它的Future（单飞）
+        
+        Args:
+            db: 数据库会话，用于读取数据库时间；不使用训练进程池时也用于训练
+            
+        Returns:
+            训练完成并发布后得到新模型快照的Future
+        """
+        since = None
+        if settings.RECOMMENDER_INCREMENTAL and self._pending is None:
+            # 训练期间缓存的订单可能早于开始时刻下单，回退一个提交延迟窗口；使用与下单时间相同的数据库时钟
+            since = db.query(func.now()).scalar() - timedelta(seconds=settings.RECOMMENDER_INCREMENTAL_LAG_SECONDS)
+        
+        with self._lock:
+            if self._pending is not None:
+                return self._pending
+            pending = Future()
+            with self._tracker_lock:
+                self._recent_orders = []
+                self._pending = pending
+            executor = None
+            if settings.RECOMMENDER_TRAIN_WORKERS > 0:
+                if self._executor is None:
+                    # spawn 启动的子进程不继承父进程的数据库连接和线程
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=settings.RECOMMENDER_TRAIN_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                executor = self._executor
+        
+        if executor is not None:
+            try:
+                job = executor.submit(_train_in_worker, since)
+            except Exception as e:
+                self._on_worker_failed(e)
+                self._finish_training(pending, error=e)
+            else:
+                job.add_done_callback(lambda done: self._on_worker_done(pending, done))
+            return pending
+        
+        # 未配置进程池时在当前线程训练，其余调用方等待同一个Future
+        try:
+            result = _build_model(db, since)
+        except Exception as e:
+            self._finish_training(pending, error=e)
+        else:
+            self._finish_training(pending, result=result)
+        return pending
+    
+    def _on_worker_done(self, pending: Future, done: Future):
+        """训练进程结束后发布结果"""
+        error = done.exception()
+        if error is not None:
+            self._on_worker_failed(error)
+            self._finish_training(pending, error=error)
+        else:
+            self._finish_training(pending, result=done.result())
+    
+    def _on_worker_failed(self, error: BaseException):
+        """训练进程异常退出或进程池已关闭时，丢弃进程池，下次训练时重建"""
+        if isinstance(error, (BrokenProcessPool, RuntimeError)):
+            with self._lock:
+                self._executor = None
+    
+    def _finish_training(self, pending: Future, result=None, error: Optional[BaseException] = None):
+        """发布训练结果并唤醒等待方"""
+        if error is None:
+            try:
+                model = self._publish(*result)
+            except Exception as e:
+                error = e
+        with self._lock:
+            with self._tracker_lock:
+                self._recent_orders = []
+                self._pending = None
+        if error is not None:
+            pending.set_exception(error)
+        else:
+            pending.set_result(model)
+    
+    def _publish(
+        self,
+        version: str,
+        model: Optional[RecommendationModel],
+        tracker: Optional[IncrementalCooccurrence]
+    ) -> RecommendationModel:
+        """替换当前模型与增量计数器，新计数器先补记训练期间到达、不在其快照中的订单"""
+        if model is None:
+            # 已发布到磁盘，本进程也改用内存映射的版本
+            model = load_model(settings.RECOMMENDER_MODEL_DIR, version)
+            self._disk_version = model.version
+            self._disk_built_at = model.built_at
+        
+        with self._tracker_lock:
+            if tracker is not None:
+                for order_id, user_id, product_id, purchased_at in self._recent_orders:
+                    if not tracker.covers_order(order_id):
+                        tracker.add_purchase(user_id, product_id, purchased_at)
+            self._tracker = tracker
+            self._model = model
+        return model
+    
+    def shutdown(self):
+        """关闭训练进程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _sync_from_disk(self, force: bool = False):
+        """
+        检查磁盘上发布的版本，有新版本时重新映射
+        
+        Args:
+            force: 忽略检查间隔立即检查
+        """
+        model_dir = settings.RECOMMENDER_MODEL_DIR
+        if not model_dir:
+            return
+        
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.RECOMMENDER_MODEL_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        
+        version = read_current_version(model_dir)
+        if version is None or version == self._disk_version:
+            return
+        
+        model = load_model(model_dir, version)
+        self._disk_version = model.version
+        self._disk_built_at = model.built_at
+        # 增量计数器继续沿用，后续订单在新版本上继续修补
+        with self._tracker_lock:
+            self._model = model
+    
+    def refresh(self, db: Session) -> RecommendationModel:
+        """
+        重新训练模型并原子替换
+        
+        Args:
+            db: 数据库会话
+            
+        Returns:
+            新的模型快照
+        """
+        return self._start_training(db).result()
+    
+    def refresh_if_stale(self, db: Session, max_age_seconds: int) -> RecommendationModel:
+        """
+        磁盘上已发布的模型足够新时直接映射，否则重新训练
+        多个工作进程同时运行定时刷新时，只有先到者会真正训练
+        
+        Args:
+            db: 数据库会话
+            max_age_seconds: 模型最长有效期（秒）
+            
+        Returns:
+            当前模型快照
+        """
+        self._sync_from_disk(force=True)
+        if self._disk_built_at is not None:
+            age = (datetime.now() - self._disk_built_at).total_seconds()
+            if age < max_age_seconds * 0.9:
+                return self._model
+        return self.refresh(db)
+    
+    def get_model(self, db: Session) -> RecommendationModel:
+        """
+        获取当前模型，尚未训练时优先加载磁盘上已发布的版本，否则现场训练一次
+        
+        Args:
+            db: 数据库会话
+            
+        Returns:
+            模型快照
+        """
+        self._sync_from_disk()
+        model = self._model
+        if model is None:
+            self._sync_from_disk(force=True)
+            model = self._model
+        if model is None:
+            # 冷启动时没有旧版本可用，等待训练完成（并发请求共享同一次训练）
+            model = self._start_training(db).result()
+        return model
+    
+    def record_order(self, user_id: int, product_id: int, order_id: int):
+        """
+        记录新订单到增量计数器（未开启增量模式或模型尚未训练时忽略）
+        有训练正在进行时同时缓存，待新计数器发布时补记
+        
+        Args:
+            user_id: 用户ID
+            product_id: 商品ID
+            order_id: 订单ID
+        """
+        if not settings.RECOMMENDER_INCREMENTAL:
+            return
+        purchased_at = datetime.now()
+        with self._tracker_lock:
+            if self._tracker is not None:
+                self._tracker.add_purchase(user_id, product_id, purchased_at)
+            if self._pending is not None:
+                self._recent_orders.append((order_id, user_id, product_id, purchased_at))
+    
+    def flush_incremental(self) -> Optional[RecommendationModel]:
+        """
+        将增量计数器中受影响的近邻行合并为新版本模型
+        
+        Returns:
+            新的模型快照，无待合并更新时返回None
+        """
+        with self._tracker_lock:
+            if self._tracker is None or not isinstance(self._model, RecommendationModel) or not self._tracker.dirty_items:
+                return None
+            rows = self._tracker.take_dirty_rows(settings.RECOMMENDER_TOP_K)
+            model = self._model.patched(rows)
+            self._model = model
+        return model
+
+
+# 全局模型注册表（进程内共享）
+model_registry = ModelRegistry()
+
+
+def start_model_refresher(interval_seconds: int) -> threading.Thread:
+    """
+    启动后台线程定期刷新推荐模型
+    
+    Args:
+        interval_seconds: 刷新间隔（秒）
+        
+    Returns:
+        后台线程对象
+    """
+    from database import SessionLocal
+    
+    def _run():
+        while True:
+            time.sleep(interval_seconds)
+            db = SessionLocal()
+            try:
+                model = model_registry.refresh_if_stale(db, interval_seconds)
+                print(f"推荐模型已刷新，版本: {model.version}")
+            except Exception as e:
+                print(f"推荐模型刷新失败: {type(e).__name__}: {str(e)}")
+            finally:
+                db.close()
+    
+    thread = threading.Thread(target=_run, name="recommender-refresher", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_incremental_flusher(interval_seconds: int) -> threading.Thread:
+    """
+    启动后台线程定期合并增量更新
+    
+    Args:
+        interval_seconds: 合并间隔（秒）
+        
+    Returns:
+        后台线程对象
+    """
+    def _run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                model_registry.flush_incremental()
+            except Exception as e:
+                print(f"推荐模型增量合并失败: {type(e).__name__}: {str(e)}")
+    
+    thread = threading.Thread(target=_run, name="recommender-incremental", daemon=True)
+    thread.start()
+    return thread
+
+
 def get_user_recommendations(db: Session, user_id: int, top_n: int = 10) -> List[Dict]:
     """
     为用户生成推荐列表（外部调用接口）
@@ -237,4 +1417,12 @@ def get_user_recommendations(db: Session, user_id: int, top_n: int = 10) -> List
         推荐商品列表
     """
     engine = RecommendationEngine(db)
+    
+    # 优先读取离线预计算结果，缺失时再现场打分
+    if settings.RECOMMENDER_USE_PRECOMPUTED:
+        result = engine.get_precomputed_recommendations(user_id, top_n)
+        if result is not None:
+            return result
+    
+    engine.model = model_registry.get_model(db)
     return engine.get_user_recommendations(user_id, top_n)
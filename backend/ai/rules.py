@@ -0,0 +1,275 @@
+"""
+声明式规则引擎
+规则定义在JSON文件中（条件、优先级、提示文案模板），加载时编译为对numpy指标列的向量化函数
+"""
+import ast
+import json
+import operator
+import os
+import string
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+# 默认规则文件
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "advisor_rules.json")
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_COMPARE_OPERATORS = {
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+_FUNCTIONS = {
+    "abs": np.abs,
+    "int": lambda value: np.trunc(value).astype(np.int64),
+    "min": np.minimum,
+    "max": np.maximum,
+}
+
+Columns = Dict[str, np.ndarray]
+
+
+class RuleError(ValueError):
+    """规则定义无效"""
+
+
+def compile_expression(source: str, names: List[str]) -> Callable[[Columns], np.ndarray]:
+    """
+    把表达式编译为对指标列的向量化函数
+    
+    支持数字常量、指标列名、+ - * /、比较（含连写）、and / or / not、
+    条件表达式 a if cond else b，以及 abs / int / min / max
+    
+    Args:
+        source: 表达式，如 "turnover_rate > 2 and stock < monthly_sales * 0.3"
+        names: 可引用的指标列名
+    
+    Returns:
+        接收列字典、返回结果数组的函数
+    """
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"表达式语法错误: {source}") from e
+    
+    def _compile(node: ast.AST) -> Callable[[Columns], np.ndarray]:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = node.value
+            return lambda columns: value
+        
+        if isinstance(node, ast.Name):
+            if node.id not in names:
+                raise RuleError(f"未知指标 {node.id}: {source}")
+            name = node.id
+            return lambda columns: columns[name]
+        
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = _compile(node.operand)
+            return lambda columns: -operand(columns)
+        
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = _compile(node.operand)
+            return lambda columns: ~np.asarray(operand(columns), dtype=bool)
+        
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            op = _BINARY_OPERATORS[type(node.op)]
+            left, right = _compile(node.left), _compile(node.right)
+            return lambda columns: op(left(columns), right(columns))
+        
+        if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPERATORS for op in node.ops):
+            operands = [_compile(node.left)] + [_compile(comparator) for comparator in node.comparators]
+            ops = [_COMPARE_OPERATORS[type(op)] for op in node.ops]
+            
+            def _compare(columns: Columns) -> np.ndarray:
+                values = [operand(columns) for operand in operands]
+                result = ops[0](values[0], values[1])
+                for index in range(1, len(ops)):
+                    result = result & ops[index](values[index], values[index + 1])
+                return result
+            return _compare
+        
+        if isinstance(node, ast.BoolOp):
+            parts = [_compile(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            
+            def _bool(columns: Columns) -> np.ndarray:
+                result = parts[0](columns)
+                for part in parts[1:]:
+                    result = combine(result, part(columns))
+                return result
+            return _bool
+        
+        if isinstance(node, ast.IfExp):
+            test, body, orelse = _compile(node.test), _compile(node.body), _compile(node.orelse)
+            return lambda columns: np.where(test(columns), body(columns), orelse(columns))
+        
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in _FUNCTIONS and not node.keywords):
+            func = _FUNCTIONS[node.func.id]
+            args = [_compile(arg) for arg in node.args]
+            return lambda columns: func(*[arg(columns) for arg in args])
+        
+        raise RuleError(f"不支持的表达式 {ast.dump(node)}: {source}")
+    
+    return _compile(tree.body)
+
+
+class Rule:
+    """
+    编译后的单条规则
+    
+    Attributes:
+        name: 规则名称
+        priority: 建议优先级（high / medium / low）
+        condition: 条件函数，返回布尔数组
+        message: 提示文案模板，占位符为指标列名或规则内 values 定义的值
+        values: 文案中用到的派生值 {名称: 计算函数}
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        priority: str,
+        condition: Callable[[Columns], np.ndarray],
+        message: str,
+        values: Dict[str, Callable[[Columns], np.ndarray]]
+    ):
+        self.name = name
+        self.priority = priority
+        self.condition = condition
+        self.message = message
+        self.values = values
+    
+    def render(self, columns: Columns, rows: np.ndarray) -> List[str]:
+        """
+        为命中的行生成提示文案
+        
+        Args:
+            columns: 指标列
+            rows: 命中本规则的行号
+        
+        Returns:
+            与 rows 一一对应的文案
+        """
+        selected = {name: column[rows] for name, column in columns.items()}
+        fields = dict(selected)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name, compute in self.values.items():
+                fields[name] = np.broadcast_to(compute(selected), rows.shape)
+        # 转为Python标量再格式化，保证与逐行计算的输出一致
+        return [
+            self.message.format(**{name: value[index].item() for name, value in fields.items()})
+            for index in range(len(rows))
+        ]
+
+
+class RuleSet:
+    """
+    按顺序排列的规则集合，先命中者优先
+    """
+    
+    def __init__(self, rules: List[Rule], metrics: List[str]):
+        self.rules = rules
+        self.metrics = metrics
+    
+    @classmethod
+    def from_definitions(cls, definitions: Dict, metrics: List[str]) -> "RuleSet":
+        """
+        编译规则定义
+        
+        Args:
+            definitions: {"rules": [{"name", "priority", "when", "message", "values"?}, ...]}
+            metrics: 可引用的指标列名
+        
+        Returns:
+            编译后的规则集
+        """
+        rules = []
+        for definition in definitions.get("rules", []):
+            try:
+                name = definition["name"]
+                priority = definition["priority"]
+                when = definition["when"]
+                message = definition["message"]
+            except KeyError as e:
+                raise RuleError(f"规则缺少字段 {e.args[0]}: {definition}") from e
+            
+            # when 可以是单个表达式，也可以是需要同时满足的表达式列表
+            condition_source = " and ".join(f"({part})" for part in when) if isinstance(when, list) else when
+            values = {
+                value_name: compile_expression(source, metrics)
+                for value_name, source in definition.get("values", {}).items()
+            }
+            
+            available = set(metrics) | set(values)
+            for _, field, _, _ in string.Formatter().parse(message):
+                if field is not None and field not in available:
+                    raise RuleError(f"规则 {name} 的文案引用了未定义的值 {field}")
+            
+            rules.append(Rule(name, priority, compile_expression(condition_source, metrics), message, values))
+        return cls(rules, metrics)
+    
+    @classmethod
+    def load(cls, path: str, metrics: List[str]) -> "RuleSet":
+        """
+        从JSON文件加载并编译规则
+        
+        Args:
+            path: 规则文件路径
+            metrics: 可引用的指标列名
+        
+        Returns:
+            编译后的规则集
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls.from_definitions(json.load(f), metrics)
+    
+    def evaluate(self, columns: Columns) -> np.ndarray:
+        """
+        计算每行命中的规则
+        
+        Args:
+            columns: 指标列，各列长度相同
+        
+        Returns:
+            每行命中的规则下标，未命中任何规则为-1
+        """
+        size = len(next(iter(columns.values())))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            conditions = [np.broadcast_to(rule.condition(columns), (size,)) for rule in self.rules]
+        if not conditions:
+            return np.full(size, -1, dtype=np.int64)
+        # np.select 按规则顺序取第一个为真的条件
+        return np.select(conditions, np.arange(len(self.rules)), default=-1)
+
+
+_rule_sets: Dict[str, RuleSet] = {}
+
+
+def get_rule_set(path: Optional[str], metrics: List[str]) -> RuleSet:
+    """
+    获取编译后的规则集，同一文件只编译一次
+    
+    Args:
+        path: 规则文件路径，None表示默认规则文件
+        metrics: 可引用的指标列名
+    
+    Returns:
+        规则集
+    """
+    path = os.path.abspath(path or DEFAULT_RULES_FILE)
+    rule_set = _rule_sets.get(path)
+    if rule_set is None:
+        rule_set = RuleSet.load(path, metrics)
+        _rule_sets[path] = rule_set
+    return rule_set
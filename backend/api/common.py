@@ -8,7 +8,8 @@ from sqlalchemy import func, desc
 from typing import Optional
 
 from database import get_db
-from models import Product, Merchant, Order
+from models import Product, Merchant
+from services.pagination import paginate, count_total
 
 router = APIRouter(prefix="/api", tags=["通用接口"])
 
@@ -18,6 +19,8 @@ def get_products(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
     category: Optional[str] = Query(None, description="类目筛选"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标，传入后按游标翻页并忽略页码"),
+    with_total: bool = Query(True, description="是否返回总数（总数会短时缓存）"),
     db: Session = Depends(get_db)
 ):
     """
@@ -32,10 +35,10 @@ def get_products(
         query = query.filter(Product.category == category)
     
     # 总数
-    total = query.count()
+    total = count_total(query, ("products", category)) if with_total else None
     
     # 分页
-    products = query.order_by(desc(Product.created_at)).offset((page - 1) * size).limit(size).all()
+    products, next_cursor = paginate(query, Product.created_at, Product.product_id, page, size, cursor)
     
     # 关联商家信息
     items = []
@@ -59,6 +62,7 @@ def get_products(
             "total": total,
             "page": page,
             "size": size,
+            "next_cursor": next_cursor,
             "items": items
         }
     }
@@ -83,11 +87,6 @@ def get_product_detail(
     # 查询商家信息
     merchant = db.query(Merchant).filter(Merchant.merchant_id == product.merchant_id).first()
     
-    # 查询销量
-    sales_count = db.query(func.sum(Order.quantity)).filter(
-        Order.product_id == product.product_id
-    ).scalar() or 0
-    
     return {
         "code": 200,
         "data": {
@@ -98,7 +97,8 @@ def get_product_detail(
             "stock": product.stock,
             "category": product.category,
             "status": product.status,
-            "sales_count": int(sales_count),
+            "sales_count": product.sales_count,
+            "order_count": product.order_count,
             "merchant_name": merchant.name if merchant else "未知商家",
             "created_at": product.created_at.isoformat()
         }
@@ -138,28 +138,22 @@ def get_hot_products(
     """
     获取热销商品列表
     """
-    hot_products = db.query(
-        Product,
-        func.sum(Order.quantity).label('sales')
-    ).join(
-        Order, Product.product_id == Order.product_id
-    ).filter(
-        Product.status == 1
-    ).group_by(
-        Product.product_id
+    hot_products = db.query(Product).filter(
+        Product.status == 1,
+        Product.sales_count > 0
     ).order_by(
-        desc('sales')
+        desc(Product.sales_count)
     ).limit(limit).all()
     
     items = []
-    for product, sales in hot_products:
+    for product in hot_products:
         merchant = db.query(Merchant).filter(Merchant.merchant_id == product.merchant_id).first()
         
         item = {
             "product_id": product.product_id,
             "name": product.name,
             "price": float(product.price),
-            "sales_count": int(sales),
+            "sales_count": product.sales_count,
             "category": product.category,
             "merchant_name": merchant.name if merchant else "未知商家"
         }
@@ -3,18 +3,25 @@
 商品管理、订单管理、数据统计
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, defer, joinedload
 from sqlalchemy import func, desc
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
+from config import settings
 from database import get_db
-from models import Merchant, Product, Order, User
+from models import Merchant, Product, Order, User, DailyProductSales
 from models import ProductCreate, ProductUpdate, ProductResponse, OrderResponse
 from models import SalesTrendResponse, TopProductResponse, CategoryDistributionResponse
 from services.auth import get_current_merchant
-from ai.advisor import get_merchant_suggestions
+from ai.advisor import get_merchant_suggestions, get_stored_merchant_suggestions, mark_products_dirty
+from services.sales_rollup import update_product_category
+from services.sales_series import load_sales_series, MAX_HOUR_DAYS
+from services.pagination import paginate, count_total
+from services.dashboard import load_merchant_dashboard
+from services.order_export import stream_export
 
 router = APIRouter(prefix="/api/merchant", tags=["商家端"])
 
@@ -24,6 +31,8 @@ def get_merchant_products(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
     status: Optional[int] = Query(None, description="商品状态筛选"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标，传入后按游标翻页并忽略页码"),
+    with_total: bool = Query(True, description="是否返回总数（总数会短时缓存）"),
     merchant: Merchant = Depends(get_current_merchant),
     db: Session = Depends(get_db)
 ):
@@ -39,24 +48,21 @@ def get_merchant_products(
         query = query.filter(Product.status == status)
     
     # 总数
-    total = query.count()
+    total = count_total(query, ("merchant_products", merchant.merchant_id, status)) if with_total else None
     
     # 分页
-    products = query.order_by(desc(Product.created_at)).offset((page - 1) * size).limit(size).all()
+    products, next_cursor = paginate(query, Product.created_at, Product.product_id, page, size, cursor)
     
-    # 查询销量
+    # 销量直接读取商品上维护的计数
     items = []
     for product in products:
-        sales_count = db.query(func.sum(Order.quantity)).filter(
-            Order.product_id == product.product_id
-        ).scalar() or 0
-        
         item = {
             "product_id": product.product_id,
             "name": product.name,
             "price": float(product.price),
             "stock": product.stock,
-            "sales_count": int(sales_count),
+            "sales_count": product.sales_count,
+            "order_count": product.order_count,
             "category": product.category,
             "status": product.status,
             "created_at": product.created_at.isoformat()
@@ -69,6 +75,7 @@ def get_merchant_products(
             "total": total,
             "page": page,
             "size": size,
+            "next_cursor": next_cursor,
             "items": items
         }
     }
@@ -94,6 +101,8 @@ def create_product(
     )
     
     db.add(new_product)
+    db.flush()
+    mark_products_dirty(db, merchant.merchant_id, [new_product.product_id])
     db.commit()
     db.refresh(new_product)
     
@@ -124,9 +133,14 @@ def update_product(
     
     # 更新字段
     update_data = product_data.model_dump(exclude_unset=True)
+    if "category" in update_data and update_data["category"] != product.category:
+        update_product_category(db, product.product_id, update_data["category"])
     for key, value in update_data.items():
         setattr(product, key, value)
     
+    # 库存、价格等变化后，商家建议需重新评估该商品
+    if update_data:
+        mark_products_dirty(db, merchant.merchant_id, [product.product_id])
     db.commit()
     db.refresh(product)
     
@@ -154,6 +168,7 @@ def delete_product(
         )
     
     db.delete(product)
+    mark_products_dirty(db, merchant.merchant_id, [product_id])
     db.commit()
     
     return {"code": 200, "message": "商品删除成功"}
@@ -164,6 +179,8 @@ def get_merchant_orders(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     status: Optional[str] = Query(None, description="订单状态筛选"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标，传入后按游标翻页并忽略页码"),
+    with_total: bool = Query(True, description="是否返回总数（总数会短时缓存）"),
     merchant: Merchant = Depends(get_current_merchant),
     db: Session = Depends(get_db)
 ):
@@ -177,16 +194,19 @@ def get_merchant_orders(
         query = query.filter(Order.status == status)
     
     # 总数
-    total = query.count()
+    total = count_total(query, ("merchant_orders", merchant.merchant_id, status)) if with_total else None
     
-    # 分页
-    orders = query.order_by(desc(Order.order_time)).offset((page - 1) * size).limit(size).all()
+    # 分页，买家名、商品名随订单一次JOIN查出
+    query = query.options(
+        defer(Order.review),
+        joinedload(Order.user).load_only(User.username),
+        joinedload(Order.product).load_only(Product.name)
+    )
+    orders, next_cursor = paginate(query, Order.order_time, Order.order_id, page, size, cursor)
     
-    # 关联查询用户和商品信息
     items = []
     for order in orders:
-        user = db.query(User).filter(User.user_id == order.user_id).first()
-        product = db.query(Product).filter(Product.product_id == order.product_id).first()
+        user, product = order.user, order.product
         
         item = {
             "order_id": order.order_id,
@@ -206,53 +226,75 @@ def get_merchant_orders(
             "total": total,
             "page": page,
             "size": size,
+            "next_cursor": next_cursor,
             "items": items
         }
     }
 
 
+@router.get("/orders/export", summary="导出订单与销量数据")
+def export_orders(
+    dataset: str = Query("orders", pattern="^(orders|sales)$", description="数据集：orders=订单明细，sales=商品日销量"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$", description="导出格式：csv/ndjson"),
+    compress: bool = Query(False, alias="gzip", description="是否gzip压缩"),
+    start_date: Optional[date] = Query(None, description="起始日期"),
+    end_date: Optional[date] = Query(None, description="结束日期（包含）"),
+    order_status: Optional[str] = Query(None, alias="status", description="订单状态筛选（仅订单明细）"),
+    merchant: Merchant = Depends(get_current_merchant)
+):
+    """
+    流式导出商家的全部订单明细或商品日销量
+    
+    服务端游标分批读取、边读边发送，导出行数不影响内存占用
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="起始日期不能晚于结束日期"
+        )
+    
+    extension = export_format
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    if compress:
+        extension += ".gz"
+        media_type = "application/gzip"
+    filename = f"{dataset}_{merchant.merchant_id}_{datetime.now():%Y%m%d%H%M%S}.{extension}"
+    
+    return StreamingResponse(
+        stream_export(merchant.merchant_id, dataset, export_format, compress, start_date, end_date, order_status),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/sales/trend", response_model=dict, summary="销售趋势统计")
 def get_sales_trend(
-    days: int = Query(30, ge=1, le=365, description="统计天数"),
+    days: int = Query(30, ge=1, le=1095, description="统计天数"),
+    granularity: str = Query("day", pattern="^(hour|day|week|month)$", description="统计粒度：hour/day/week/month"),
+    product_id: Optional[int] = Query(None, description="只统计该商品"),
     merchant: Merchant = Depends(get_current_merchant),
     db: Session = Depends(get_db)
 ):
     """
-    获取近N天销量趋势数据（用于折线图）
+    获取近N天销售趋势数据（用于折线图），按小时/天/周/月分桶，缺失的桶填充为0
     """
+    if granularity == "hour" and days > MAX_HOUR_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"按小时统计最多支持 {MAX_HOUR_DAYS} 天"
+        )
+    
     # 计算起始日期
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days - 1)
     
-    # 查询每日销量
-    daily_sales = db.query(
-        func.date(Order.order_time).label('date'),
-        func.count(Order.order_id).label('sales')
-    ).filter(
-        Order.merchant_id == merchant.merchant_id,
-        func.date(Order.order_time) >= start_date,
-        func.date(Order.order_time) <= end_date
-    ).group_by(
-        func.date(Order.order_time)
-    ).all()
-    
-    # 构建完整日期序列（填充缺失日期为0）
-    sales_dict = {str(item.date): item.sales for item in daily_sales}
-    
-    dates = []
-    sales = []
-    current_date = start_date
-    while current_date <= end_date:
-        date_str = str(current_date)
-        dates.append(date_str)
-        sales.append(sales_dict.get(date_str, 0))
-        current_date += timedelta(days=1)
+    series = load_sales_series(db, merchant.merchant_id, start_date, end_date, granularity, product_id)
     
     return {
         "code": 200,
         "data": {
-            "dates": dates,
-            "sales": sales
+            "granularity": granularity,
+            **series
         }
     }
 
@@ -266,12 +308,12 @@ def get_top_products(
     """
     获取销量Top N商品（用于柱状图）
     """
-    # 查询商品销量
+    # 从日销量汇总表查询商品销量
     top_products = db.query(
         Product.name,
-        func.sum(Order.quantity).label('sales')
+        func.sum(DailyProductSales.quantity).label('sales')
     ).join(
-        Order, Product.product_id == Order.product_id
+        DailyProductSales, Product.product_id == DailyProductSales.product_id
     ).filter(
         Product.merchant_id == merchant.merchant_id
     ).group_by(
@@ -296,16 +338,14 @@ def get_category_distribution(
     """
     获取各类目销售占比（用于饼图）
     """
-    # 查询类目销量
+    # 从日销量汇总表查询类目销量
     category_sales = db.query(
-        Product.category,
-        func.sum(Order.quantity).label('value')
-    ).join(
-        Order, Product.product_id == Order.product_id
+        DailyProductSales.category,
+        func.sum(DailyProductSales.quantity).label('value')
     ).filter(
-        Product.merchant_id == merchant.merchant_id
+        DailyProductSales.merchant_id == merchant.merchant_id
     ).group_by(
-        Product.category
+        DailyProductSales.category
     ).all()
     
     data = [
@@ -321,19 +361,64 @@ def get_category_distribution(
 
 @router.get("/ai/suggestions", response_model=dict, summary="获取AI经营建议")
 def get_ai_suggestions(
+    refresh: bool = Query(False, description="忽略已保存的结果重新计算"),
     merchant: Merchant = Depends(get_current_merchant),
     db: Session = Depends(get_db)
 ):
     """
     获取AI生成的经营建议
     
-    基于规则引擎分析销售数据
+    基于规则引擎分析销售数据；优先返回离线任务生成的结果，结果缺失或过期时重新计算
     """
-    suggestions = get_merchant_suggestions(db, merchant.merchant_id)
+    if settings.ADVISOR_USE_PRECOMPUTED:
+        suggestions, generated_at = get_stored_merchant_suggestions(db, merchant.merchant_id, refresh)
+    else:
+        suggestions, generated_at = get_merchant_suggestions(db, merchant.merchant_id), datetime.now()
     
     return {
         "code": 200,
         "data": {
-            "suggestions": suggestions
+            "suggestions": suggestions,
+            "generated_at": generated_at.isoformat()
         }
     }
+
+
+@router.get("/dashboard", response_model=dict, summary="商家数据看板")
+def get_dashboard(
+    days: int = Query(30, ge=1, le=1095, description="统计天数（未指定起始日期时使用）"),
+    start_date: Optional[date] = Query(None, description="起始日期"),
+    end_date: Optional[date] = Query(None, description="结束日期（包含），默认今天"),
+    granularity: str = Query("day", pattern="^(day|week|month)$", description="趋势统计粒度：day/week/month"),
+    limit: int = Query(10, ge=1, le=50, description="热销商品数量"),
+    include_suggestions: bool = Query(True, description="是否同时返回AI经营建议"),
+    merchant: Merchant = Depends(get_current_merchant),
+    db: Session = Depends(get_db)
+):
+    """
+    一次返回看板所需的全部数据：销售趋势、热销商品、类目分布、核心指标（GMV、客单价、订单数）及经营建议
+    
+    趋势、热销商品、类目分布与核心指标由同一次日销量汇总查询计算
+    """
+    end_date = end_date or datetime.now().date()
+    start_date = start_date or end_date - timedelta(days=days - 1)
+    if start_date > end_date or (end_date - start_date).days >= 1095:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="日期范围无效，起始日期不能晚于结束日期且跨度不超过1095天"
+        )
+    
+    data = load_merchant_dashboard(db, merchant.merchant_id, start_date, end_date, granularity, limit)
+    
+    if include_suggestions:
+        if settings.ADVISOR_USE_PRECOMPUTED:
+            suggestions, generated_at = get_stored_merchant_suggestions(db, merchant.merchant_id)
+        else:
+            suggestions, generated_at = get_merchant_suggestions(db, merchant.merchant_id), datetime.now()
+        data["suggestions"] = suggestions
+        data["suggestions_generated_at"] = generated_at.isoformat()
+    
+    return {
+        "code": 200,
+        "data": data
+    }
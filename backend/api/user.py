@@ -3,14 +3,18 @@
 订单管理、商品搜索、个性化推荐
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_
 from typing import List, Optional
 
 from database import get_db
 from models import User, Product, Order, Merchant, OrderCreate, ProductSearch
 from services.auth import get_current_user
-from ai.recommender import get_user_recommendations
+from ai.recommender import get_user_recommendations, model_registry
+from ai.advisor import mark_products_dirty
+from services.sales_rollup import record_order_sale
+from services.product_sales import update_sales_counters, CANCELLED_STATUS
+from services.pagination import paginate, count_total
 
 router = APIRouter(prefix="/api/user", tags=["买家端"])
 
@@ -19,6 +23,8 @@ router = APIRouter(prefix="/api/user", tags=["买家端"])
 def get_user_orders(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标，传入后按游标翻页并忽略页码"),
+    with_total: bool = Query(True, description="是否返回总数（总数会短时缓存）"),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -27,15 +33,18 @@ def get_user_orders(
     """
     # 查询订单
     query = db.query(Order).filter(Order.user_id == user.user_id)
-    total = query.count()
+    total = count_total(query, ("user_orders", user.user_id)) if with_total else None
     
-    orders = query.order_by(desc(Order.order_time)).offset((page - 1) * size).limit(size).all()
+    # 商品名、商家名随订单一次JOIN查出
+    query = query.options(
+        joinedload(Order.product).load_only(Product.name),
+        joinedload(Order.merchant).load_only(Merchant.name)
+    )
+    orders, next_cursor = paginate(query, Order.order_time, Order.order_id, page, size, cursor)
     
-    # 关联查询商品和商家信息
     items = []
     for order in orders:
-        product = db.query(Product).filter(Product.product_id == order.product_id).first()
-        merchant = db.query(Merchant).filter(Merchant.merchant_id == order.merchant_id).first()
+        product, merchant = order.product, order.merchant
         
         item = {
             "order_id": order.order_id,
@@ -56,6 +65,7 @@ def get_user_orders(
             "total": total,
             "page": page,
             "size": size,
+            "next_cursor": next_cursor,
             "items": items
         }
     }
@@ -110,9 +120,18 @@ def create_order(
         )
         
         db.add(new_order)
+        db.flush()
+        # 同一事务内累加商品销量计数与日销量汇总
+        update_sales_counters(db, product.product_id, new_order.quantity)
+        record_order_sale(db, new_order, product.category)
+        # 销量与库存变化，商家建议需重新评估该商品
+        mark_products_dirty(db, product.merchant_id, [product.product_id])
         db.commit()
         db.refresh(new_order)
         
+        # 增量更新推荐模型的共现计数
+        model_registry.record_order(user.user_id, product.product_id, new_order.order_id)
+        
         return {
             "code": 200,
             "message": "下单成功",
@@ -132,6 +151,65 @@ def create_order(
         )
 
 
+@router.post("/orders/{order_id}/cancel", response_model=dict, summary="取消订单")
+def cancel_order(
+    order_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    取消待处理订单
+    
+    - 恢复库存
+    - 扣减商品销量计数与日销量汇总
+    """
+    # 锁定订单，防止重复取消
+    order = db.query(Order).filter(
+        Order.order_id == order_id,
+        Order.user_id == user.user_id
+    ).with_for_update().first()
+    
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="订单不存在"
+        )
+    
+    if order.status != 'pending':
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="仅待处理的订单可以取消"
+        )
+    
+    product = db.query(Product).filter(Product.product_id == order.product_id).first()
+    
+    try:
+        order.status = CANCELLED_STATUS
+        product.stock += order.quantity
+        db.flush()
+        
+        update_sales_counters(db, product.product_id, order.quantity, sign=-1)
+        record_order_sale(db, order, product.category, sign=-1)
+        mark_products_dirty(db, product.merchant_id, [product.product_id])
+        db.commit()
+        
+        return {
+            "code": 200,
+            "message": "订单已取消",
+            "data": {
+                "order_id": order.order_id,
+                "status": order.status
+            }
+        }
+    
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"取消订单失败：{str(e)}"
+        )
+
+
 @router.post("/search", response_model=dict, summary="商品搜索")
 def search_products(
     search_data: ProductSearch,
@@ -22,6 +22,53 @@ class Settings(BaseSettings):
     APP_NAME: str = "网上商城系统"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
+    PAGINATION_COUNT_CACHE_SECONDS: int = 30  # 列表总数缓存秒数，0表示不缓存
+    EXPORT_BATCH_SIZE: int = 5000  # 数据导出时服务端游标每批读取的行数
+    
+    # 推荐模型配置
+    RECOMMENDER_BACKEND: str = "itemcf"  # 推荐算法：itemcf=基于物品的协同过滤，als=隐式反馈矩阵分解
+    RECOMMENDER_WARMUP_ON_STARTUP: bool = True  # 启动时预先训练推荐模型
+    RECOMMENDER_REFRESH_INTERVAL: int = 3600  # 后台刷新间隔（秒），0表示不自动刷新
+    RECOMMENDER_TRAIN_WORKERS: int = 1  # 训练进程池大小，0表示在调用线程内训练
+    RECOMMENDER_SPARSE_MATRIX: bool = True  # 使用稀疏CSR矩阵构建用户-商品矩阵
+    RECOMMENDER_TOP_K: int = 50  # 每个商品保留的相似商品数量
+    RECOMMENDER_STREAMING_BUILD: bool = False  # 使用服务端游标流式读取订单构建矩阵
+    RECOMMENDER_STREAM_CHUNK_SIZE: int = 50000  # 流式构建时每次读取的订单行数
+    RECOMMENDER_DECAY_HALF_LIFE_DAYS: float = 0  # 购买权重按下单时间指数衰减的半衰期（天），0表示不衰减
+    RECOMMENDER_INCREMENTAL: bool = False  # 新订单增量更新共现计数
+    RECOMMENDER_INCREMENTAL_FLUSH_INTERVAL: int = 5  # 增量更新合并为新模型版本的间隔（秒）
+    RECOMMENDER_INCREMENTAL_LAG_SECONDS: int = 60  # 下单事务从写入到提交的最长间隔（秒），训练快照记录窗口内的订单ID用于补记
+    RECOMMENDER_USE_PRECOMPUTED: bool = True  # 优先读取离线预计算的推荐结果
+    RECOMMENDER_PRECOMPUTED_MAX_AGE_HOURS: int = 48  # 预计算结果的最长有效期（小时）
+    RECOMMENDER_BATCH_CHUNK_SIZE: int = 2000  # 离线预计算每批用户数
+    RECOMMENDER_BATCH_TOP_N: int = 50  # 离线预计算为每个用户保存的推荐数量
+    RECOMMENDER_MODEL_DIR: Optional[str] = None  # 模型发布目录，设置后各工作进程以内存映射方式共享模型
+    RECOMMENDER_MODEL_CHECK_INTERVAL: int = 30  # 检查磁盘上新模型版本的间隔（秒）
+    RECOMMENDER_MODEL_KEEP_VERSIONS: int = 3  # 模型目录中保留的版本数
+    RECOMMENDER_ALS_FACTORS: int = 64  # ALS因子数
+    RECOMMENDER_ALS_ITERATIONS: int = 15  # ALS交替迭代轮数
+    RECOMMENDER_ALS_REGULARIZATION: float = 0.01  # ALS正则化系数
+    RECOMMENDER_ALS_ALPHA: float = 40.0  # ALS置信度系数 c = 1 + alpha·购买次数
+    
+    # 经营建议配置
+    ADVISOR_VECTORIZED: bool = True  # 使用列式规则引擎一次评估所有商品
+    ADVISOR_RULES_FILE: Optional[str] = None  # 经营建议规则文件（JSON），默认使用 ai/advisor_rules.json
+    ADVISOR_USE_PRECOMPUTED: bool = True  # 建议接口优先返回离线生成的结果
+    ADVISOR_SUGGESTIONS_MAX_AGE_HOURS: int = 24  # 已保存建议的有效期（小时），过期后请求时重新计算
+    ADVISOR_INCREMENTAL: bool = True  # 请求时只重新评估有变化的商品（替代按有效期全量重算）
+    ADVISOR_DIRTY_MARK_LAG_SECONDS: int = 60  # 脏标记从写入到事务提交的最长间隔（秒），窗口内的标记会被重新读取
+    ADVISOR_BATCH_WORKERS: int = 4  # 离线批量生成时并行评估规则的进程数，0表示在当前进程内评估
+    ADVISOR_FORECAST: bool = True  # 用指数平滑预测日销量估算售罄天数，关闭时按近30天日均销量估算
+    ADVISOR_FORECAST_HISTORY_DAYS: int = 56  # 拟合使用的历史日销量天数
+    ADVISOR_FORECAST_HORIZON_DAYS: int = 90  # 预测天数（售罄天数上限）
+    ADVISOR_REORDER_LEAD_DAYS: int = 7  # 补货到货天数
+    ADVISOR_REORDER_COVER_DAYS: int = 14  # 补货需覆盖的销售天数
+    ADVISOR_REORDER_SERVICE_Z: float = 1.65  # 安全库存的服务水平分位数（1.65约为95%）
+    
+    # 销售汇总配置
+    SALES_ROLLUP_MODE: str = "sync"  # 日销量汇总更新方式：sync（下单事务内更新）/ catchup（追补任务更新）
+    SALES_ROLLUP_BATCH_SIZE: int = 10000  # 追补任务每批处理的订单数
+    SALES_ROLLUP_LAG_SECONDS: int = 60  # 追补任务只汇总下单时间早于该秒数的订单，等待并发的下单事务提交
     
     # CORS配置
     CORS_ORIGINS: list = ["http://localhost:5173", "http://localhost:3000"]
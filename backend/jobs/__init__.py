@@ -0,0 +1,4 @@
+"""
+离线任务包
+可由定时任务（cron / Windows 任务计划）以 python -m jobs.<任务名> 方式运行
+"""
@@ -0,0 +1,95 @@
+"""
+推荐结果离线预计算任务
+分块为所有用户批量打分，每块只做一次稀疏矩阵乘法，结果写入 user_recommendations 表
+
+用法（在 backend 目录下）：
+    python -m jobs.precompute_recommendations
+"""
+import time
+import numpy as np
+from datetime import datetime
+from typing import Dict, Optional
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import UserRecommendation
+from ai.recommender import create_engine
+
+
+def precompute_recommendations(
+    db: Session,
+    chunk_size: Optional[int] = None,
+    top_n: Optional[int] = None
+) -> Dict:
+    """
+    为所有有购买记录的用户预计算推荐结果
+    
+    Args:
+        db: 数据库会话
+        chunk_size: 每批用户数，默认读取配置 RECOMMENDER_BATCH_CHUNK_SIZE
+        top_n: 每个用户保存的推荐数量，默认读取配置 RECOMMENDER_BATCH_TOP_N
+    
+    Returns:
+        运行统计（用户数、耗时、吞吐量、模型版本）
+    """
+    chunk_size = chunk_size or settings.RECOMMENDER_BATCH_CHUNK_SIZE
+    top_n = top_n or settings.RECOMMENDER_BATCH_TOP_N
+    
+    # 训练模型，复用训练时构建的用户-商品矩阵作为购买矩阵
+    engine = create_engine(db)
+    model = engine.train()
+    if model.is_empty:
+        return {"users": 0, "seconds": 0.0, "users_per_second": 0.0, "model_version": model.version}
+    
+    purchases = sparse.csr_matrix(engine.user_item_matrix, dtype=np.float32)
+    purchases.eliminate_zeros()
+    purchases.data[:] = 1
+    
+    n_users = purchases.shape[0]
+    generated_at = datetime.now()
+    started = time.perf_counter()
+    
+    for start in range(0, n_users, chunk_size):
+        end = min(start + chunk_size, n_users)
+        user_ids = engine.user_ids[start:end]
+        results = model.recommend_batch(user_ids, purchases[start:end], top_n)
+        
+        rows = [
+            {
+                "user_id": int(user_id),
+                "product_ids": ",".join(str(int(item_id)) for item_id in item_ids),
+                "scores": ",".join(f"{score:.6f}" for score in scores),
+                "model_version": model.version,
+                "generated_at": generated_at
+            }
+            for user_id, (item_ids, scores) in zip(user_ids, results)
+        ]
+        
+        # 按批替换旧结果
+        db.query(UserRecommendation).filter(
+            UserRecommendation.user_id.in_([int(user_id) for user_id in user_ids])
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(UserRecommendation, rows)
+        db.commit()
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "users": n_users,
+        "seconds": round(elapsed, 3),
+        "users_per_second": round(n_users / elapsed, 1) if elapsed > 0 else 0.0,
+        "model_version": model.version
+    }
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        stats = precompute_recommendations(db)
+        print(
+            f"推荐预计算完成：{stats['users']} 个用户，耗时 {stats['seconds']} 秒，"
+            f"吞吐量 {stats['users_per_second']} 用户/秒，模型版本 {stats['model_version']}"
+        )
+    finally:
+        db.close()
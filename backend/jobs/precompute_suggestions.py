@@ -0,0 +1,182 @@
+"""
+商家经营建议离线批量生成任务
+一次聚合所有商品的窗口销量与类目均价，按商家分块在多个进程中并行评估规则，
+结果写入 merchant_suggestions 表，建议接口直接读取
+
+用法（在 backend 目录下）：
+    python -m jobs.precompute_suggestions
+"""
+import json
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Merchant, Product, MerchantSuggestion, AdvisorDirtyProduct
+from ai.advisor import BusinessAdvisor, sort_suggestions, serialize_category_prices
+from ai.forecast import SalesForecast, forecast_sales
+
+# 规则评估所需的商品字段（可在进程间传递）
+ProductSnapshot = namedtuple("ProductSnapshot", ["product_id", "merchant_id", "name", "category", "stock", "price"])
+
+
+def _evaluate_chunk(
+    products: List[ProductSnapshot],
+    sales_by_product: Dict[int, Tuple[int, int, int]],
+    avg_prices: Dict[Optional[str], float],
+    forecast: Optional[SalesForecast] = None
+) -> Dict[int, List[Dict]]:
+    """
+    对一批商家的商品一次性评估规则
+    
+    Args:
+        products: 商品快照列表
+        sales_by_product: {商品ID: (近7天销量, 前7天销量, 近30天销量)}
+        avg_prices: {类目: 同类目平均价格}
+        forecast: 这些商品的销量预测结果
+    
+    Returns:
+        {商家ID: 已排序的建议列表}
+    """
+    merchant_of = {product.product_id: product.merchant_id for product in products}
+    results = {merchant_id: [] for merchant_id in merchant_of.values()}
+    for suggestion in BusinessAdvisor(None)._apply_rules_columnar(products, sales_by_product, avg_prices, forecast):
+        results[merchant_of[suggestion["product_id"]]].append(suggestion)
+    return {merchant_id: sort_suggestions(suggestions) for merchant_id, suggestions in results.items()}
+
+
+def _split_by_merchant(products: List[ProductSnapshot], chunks: int) -> List[List[ProductSnapshot]]:
+    """
+    把按商家排序的商品切成商品数大致相等的若干块，同一商家的商品不跨块
+    
+    Args:
+        products: 按商家ID排序的商品快照
+        chunks: 目标块数
+    
+    Returns:
+        商品块列表
+    """
+    target = max(1, len(products) // max(1, chunks))
+    result, current = [], []
+    for index, product in enumerate(products):
+        current.append(product)
+        is_last = index + 1 == len(products)
+        if is_last or (len(current) >= target and products[index + 1].merchant_id != product.merchant_id):
+            result.append(current)
+            current = []
+    return result
+
+
+def precompute_suggestions(db: Session, workers: Optional[int] = None) -> Dict:
+    """
+    为所有商家生成经营建议并保存
+    
+    Args:
+        db: 数据库会话
+        workers: 并行评估规则的进程数，默认读取配置 ADVISOR_BATCH_WORKERS，0表示在当前进程内评估
+    
+    Returns:
+        运行统计（商家数、商品数、建议数、耗时）
+    """
+    if workers is None:
+        workers = settings.ADVISOR_BATCH_WORKERS
+    started = time.perf_counter()
+    generated_at = datetime.now()
+    # 此前的脏标记都会被本次全量计算覆盖
+    dirty_mark_id = db.query(func.max(AdvisorDirtyProduct.id)).scalar() or 0
+    
+    # 全量聚合：所有商品的窗口销量与所有类目的均价各一次查询
+    advisor = BusinessAdvisor(db)
+    sales_by_product = advisor._load_sales_windows(day=generated_at.date())
+    avg_prices = advisor._load_category_avg_prices()
+    forecast = forecast_sales(db, day=generated_at.date()) if settings.ADVISOR_FORECAST else None
+    products = [
+        ProductSnapshot(product_id, merchant_id, name, category, stock, price)
+        for product_id, merchant_id, name, category, stock, price in db.query(
+            Product.product_id, Product.merchant_id, Product.name,
+            Product.category, Product.stock, Product.price
+        ).order_by(Product.merchant_id, Product.product_id)
+    ]
+    merchant_ids = [merchant_id for merchant_id, in db.query(Merchant.merchant_id)]
+    merchant_categories: Dict[int, set] = {merchant_id: set() for merchant_id in merchant_ids}
+    for product in products:
+        merchant_categories.setdefault(product.merchant_id, set()).add(product.category)
+    
+    results: Dict[int, List[Dict]] = {merchant_id: [] for merchant_id in merchant_ids}
+    chunks = _split_by_merchant(products, max(1, workers) * 4)
+    jobs = [
+        (chunk, {
+            product.product_id: sales_by_product[product.product_id]
+            for product in chunk if product.product_id in sales_by_product
+        }, forecast.select([product.product_id for product in chunk])[0] if forecast is not None else None)
+        for chunk in chunks
+    ]
+    
+    if workers > 0 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_evaluate_chunk, chunk, sales, avg_prices, chunk_forecast)
+                for chunk, sales, chunk_forecast in jobs
+            ]
+            for future in futures:
+                results.update(future.result())
+    else:
+        for chunk, sales, chunk_forecast in jobs:
+            results.update(_evaluate_chunk(chunk, sales, avg_prices, chunk_forecast))
+    
+    # 按批替换旧结果
+    merchant_ids = list(results)
+    batch_size = 1000
+    for start in range(0, len(merchant_ids), batch_size):
+        batch = merchant_ids[start:start + batch_size]
+        db.query(MerchantSuggestion).filter(
+            MerchantSuggestion.merchant_id.in_(batch)
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(MerchantSuggestion, [
+            {
+                "merchant_id": merchant_id,
+                "suggestions": json.dumps(results[merchant_id], ensure_ascii=False),
+                "suggestion_count": len(results[merchant_id]),
+                "generated_at": generated_at,
+                "window_date": generated_at.date(),
+                "category_prices": serialize_category_prices({
+                    category: avg_prices.get(category, 0) for category in merchant_categories.get(merchant_id, ())
+                }),
+                "dirty_mark_id": dirty_mark_id
+            }
+            for merchant_id in batch
+        ])
+        db.commit()
+    
+    # 清理已被覆盖的脏标记：只删除开始计算前已确定提交的标记，
+    # 提交较晚、ID却不大于 dirty_mark_id 的标记留给增量计算按写入时间重新读取
+    db.query(AdvisorDirtyProduct).filter(
+        AdvisorDirtyProduct.id <= dirty_mark_id,
+        AdvisorDirtyProduct.marked_at < generated_at - timedelta(seconds=settings.ADVISOR_DIRTY_MARK_LAG_SECONDS)
+    ).delete(synchronize_session=False)
+    db.commit()
+    
+    return {
+        "merchants": len(results),
+        "products": len(products),
+        "suggestions": sum(len(suggestions) for suggestions in results.values()),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        stats = precompute_suggestions(db)
+        print(
+            f"经营建议生成完成：{stats['merchants']} 个商家，{stats['products']} 个商品，"
+            f"{stats['suggestions']} 条建议，耗时 {stats['seconds']} 秒"
+        )
+    finally:
+        db.close()
@@ -0,0 +1,25 @@
+"""
+商品销量计数对账任务
+从订单表重新聚合每个商品的销量与订单数，修正 products 表上的冗余计数
+（首次部署、导入历史订单后或定期校验时运行）
+
+用法（在 backend 目录下）：
+    python -m jobs.reconcile_product_sales
+"""
+import time
+
+from database import SessionLocal
+from services.product_sales import reconcile_sales_counters
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        stats = reconcile_sales_counters(db)
+        print(
+            f"销量计数对账完成：{stats['products']} 个商品，修正 {stats['corrected']} 个，"
+            f"耗时 {time.perf_counter() - started:.3f} 秒"
+        )
+    finally:
+        db.close()
@@ -0,0 +1,36 @@
+"""
+商品日销量汇总追补任务
+从高水位开始把新订单汇总进 daily_product_sales 表（SALES_ROLLUP_MODE=catchup 时定期运行），
+或清空后重新汇总全部订单（--rebuild，首次部署、切换汇总方式或修复数据时使用）
+
+用法（在 backend 目录下）：
+    python -m jobs.rollup_sales
+    python -m jobs.rollup_sales --rebuild
+"""
+import argparse
+import time
+
+from config import settings
+from database import SessionLocal
+from services.sales_rollup import catch_up, rebuild
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="商品日销量汇总追补任务")
+    parser.add_argument("--rebuild", action="store_true", help="清空汇总表并重新汇总全部订单")
+    args = parser.parse_args()
+    
+    if settings.SALES_ROLLUP_MODE == "sync" and not args.rebuild:
+        # 同步模式下新订单已在下单事务内汇总，追补会重复累加
+        print("当前为同步汇总模式（SALES_ROLLUP_MODE=sync），无需追补；如需重建请使用 --rebuild")
+    else:
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            stats = rebuild(db) if args.rebuild else catch_up(db)
+            print(
+                f"销量汇总完成：{stats['orders']} 个订单，{stats['rows']} 条汇总行，"
+                f"高水位订单ID {stats['last_order_id']}，耗时 {time.perf_counter() - started:.3f} 秒"
+            )
+        finally:
+            db.close()
@@ -10,6 +10,8 @@ import traceback
 
 # 导入路由
 from api import auth, merchant, user, common
+from ai.recommender import model_registry, start_model_refresher, start_incremental_flusher
+from database import SessionLocal
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -62,6 +64,38 @@ app.include_router(user.router)
 app.include_router(common.router)
 
 
+@app.on_event("startup")
+def warmup_recommender():
+    """
+    启动时训练推荐模型并开启后台定期刷新
+    """
+    if settings.RECOMMENDER_WARMUP_ON_STARTUP:
+        db = SessionLocal()
+        try:
+            # 已发布到模型目录的版本直接映射，避免每个工作进程各自训练
+            model = model_registry.get_model(db)
+            print(f"推荐模型预热完成，版本: {model.version}")
+        except Exception as e:
+            # 预热失败不影响启动，首个推荐请求时会重新训练
+            print(f"推荐模型预热失败: {type(e).__name__}: {str(e)}")
+        finally:
+            db.close()
+    
+    if settings.RECOMMENDER_REFRESH_INTERVAL > 0:
+        start_model_refresher(settings.RECOMMENDER_REFRESH_INTERVAL)
+    
+    if settings.RECOMMENDER_INCREMENTAL:
+        start_incremental_flusher(settings.RECOMMENDER_INCREMENTAL_FLUSH_INTERVAL)
+
+
+@app.on_event("shutdown")
+def shutdown_recommender():
+    """
+    关闭推荐模型训练进程池
+    """
+    model_registry.shutdown()
+
+
 @app.get("/", tags=["根路径"])
 def read_root():
     """
@@ -1,7 +1,10 @@
 """
 models包初始化文件
 """
-from .models import User, Merchant, Product, Order
+from .models import (
+    User, Merchant, Product, Order, UserRecommendation, MerchantSuggestion, AdvisorDirtyProduct,
+    DailyProductSales, SalesRollupState
+)
 from .schemas import (
     UserRegister, UserLogin, UserResponse,
     MerchantRegister, MerchantResponse,
@@ -15,7 +18,8 @@ from .schemas import (
 
 __all__ = [
     # ORM Models
-    "User", "Merchant", "Product", "Order",
+    "User", "Merchant", "Product", "Order", "UserRecommendation", "MerchantSuggestion", "AdvisorDirtyProduct",
+    "DailyProductSales", "SalesRollupState",
     # Schemas
     "UserRegister", "UserLogin", "UserResponse",
     "MerchantRegister", "MerchantResponse",
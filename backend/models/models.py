@@ -2,7 +2,7 @@
 数据库ORM模型定义
 SQLAlchemy模型类
 """
-from sqlalchemy import Column, BigInteger, String, Integer, DECIMAL, DateTime, Text, ForeignKey, Index
+from sqlalchemy import Column, BigInteger, String, Integer, DECIMAL, Date, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -51,6 +51,8 @@ class Product(Base):
     stock = Column(Integer, default=0, comment='库存数量')
     category = Column(String(50), comment='商品类目')
     status = Column(Integer, default=1, comment='1=上架, 2=下架')
+    sales_count = Column(Integer, nullable=False, default=0, comment='累计销量（不含已取消订单）')
+    order_count = Column(Integer, nullable=False, default=0, comment='累计订单数（不含已取消订单）')
     created_at = Column(DateTime, server_default=func.now(), comment='创建时间')
     
     # 关系
@@ -61,6 +63,9 @@ class Product(Base):
     __table_args__ = (
         Index('idx_merchant_status', 'merchant_id', 'status'),
         Index('idx_category_status', 'category', 'status'),
+        Index('idx_status_sales', 'status', 'sales_count'),
+        Index('idx_merchant_created', 'merchant_id', 'created_at'),
+        Index('idx_status_created', 'status', 'created_at'),
     )
 
 
@@ -90,3 +95,68 @@ class Order(Base):
         Index('idx_merchant_time', 'merchant_id', 'order_time'),
         Index('idx_product', 'product_id'),
     )
+
+
+class UserRecommendation(Base):
+    """用户推荐结果表模型（离线预计算）"""
+    __tablename__ = "user_recommendations"
+    
+    user_id = Column(BigInteger, ForeignKey('users.user_id', ondelete='CASCADE'), primary_key=True, comment='用户ID')
+    product_ids = Column(Text, nullable=False, comment='推荐商品ID，逗号分隔，按分数降序')
+    scores = Column(Text, nullable=False, comment='推荐分数，逗号分隔，与商品ID一一对应')
+    model_version = Column(String(32), nullable=False, comment='生成结果的模型版本')
+    generated_at = Column(DateTime, nullable=False, comment='生成时间')
+
+
+class MerchantSuggestion(Base):
+    """商家经营建议结果表模型（离线批量生成）"""
+    __tablename__ = "merchant_suggestions"
+    
+    merchant_id = Column(BigInteger, ForeignKey('merchants.merchant_id', ondelete='CASCADE'), primary_key=True, comment='商家ID')
+    suggestions = Column(Text(16777215), nullable=False, comment='建议列表JSON，按优先级排序')
+    suggestion_count = Column(Integer, nullable=False, default=0, comment='建议条数')
+    generated_at = Column(DateTime, nullable=False, comment='生成时间')
+    window_date = Column(Date, nullable=False, comment='统计窗口对齐的日期')
+    category_prices = Column(Text, nullable=False, comment='计算时使用的类目均价JSON')
+    dirty_mark_id = Column(BigInteger, nullable=False, default=0, comment='已处理的脏标记最大ID')
+
+
+class AdvisorDirtyProduct(Base):
+    """经营建议脏标记表模型：记录自上次计算后发生变化的商品（只追加）"""
+    __tablename__ = "advisor_dirty_products"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True, comment='标记ID')
+    merchant_id = Column(BigInteger, nullable=False, comment='商家ID')
+    product_id = Column(BigInteger, nullable=False, comment='商品ID')
+    marked_at = Column(DateTime, nullable=False, comment='标记时间')
+    
+    __table_args__ = (
+        Index('idx_merchant_mark', 'merchant_id', 'id'),
+        Index('idx_merchant_marked_at', 'merchant_id', 'marked_at'),
+    )
+
+
+class DailyProductSales(Base):
+    """商品日销量汇总表模型：按 (商品, 日期) 汇总订单，供统计接口与经营建议读取"""
+    __tablename__ = "daily_product_sales"
+    
+    product_id = Column(BigInteger, primary_key=True, comment='商品ID')
+    sale_date = Column(Date, primary_key=True, comment='销售日期')
+    merchant_id = Column(BigInteger, nullable=False, comment='商家ID')
+    category = Column(String(50), comment='商品类目')
+    quantity = Column(Integer, nullable=False, default=0, comment='销量')
+    revenue = Column(DECIMAL(14, 2), nullable=False, default=0, comment='销售额')
+    order_count = Column(Integer, nullable=False, default=0, comment='订单数')
+    
+    __table_args__ = (
+        Index('idx_merchant_date', 'merchant_id', 'sale_date'),
+    )
+
+
+class SalesRollupState(Base):
+    """汇总任务进度表模型：记录追补任务已处理到的订单ID（高水位）"""
+    __tablename__ = "sales_rollup_state"
+    
+    name = Column(String(50), primary_key=True, comment='汇总表名')
+    last_order_id = Column(BigInteger, nullable=False, default=0, comment='已汇总的最大订单ID')
+    updated_at = Column(DateTime, nullable=False, comment='更新时间')
@@ -95,7 +95,8 @@ class ProductResponse(BaseModel):
     category: Optional[str]
     status: int
     created_at: datetime
-    sales_count: Optional[int] = 0  # 销量（需要关联查询）
+    sales_count: Optional[int] = 0  # 累计销量
+    order_count: Optional[int] = 0  # 累计订单数
     merchant_name: Optional[str] = None  # 商家名称（关联查询）
     
     class Config:
@@ -167,8 +168,11 @@ class ProductSearch(BaseModel):
 # ============================================
 class SalesTrendResponse(BaseModel):
     """销售趋势响应"""
+    granularity: str = "day"
     dates: List[str]
     sales: List[int]
+    quantity: List[int] = []
+    revenue: List[float] = []
 
 
 class TopProductResponse(BaseModel):
@@ -0,0 +1,111 @@
+"""
+商家数据看板服务
+一次读取商家在日期范围内的 (商品, 日期) 日销量汇总行，
+由同一份结果计算销售趋势、热销商品、类目分布与核心指标（GMV、客单价、订单数）
+"""
+import numpy as np
+from datetime import date
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from models import Product, DailyProductSales
+from services.sales_series import bucket_starts, fill_series
+
+
+def _group_sum(keys: list, values: np.ndarray):
+    """按键对值求和，返回 (去重后的键, 每个键的合计)"""
+    unique, inverse = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    return unique, np.bincount(inverse, weights=values, minlength=len(unique))
+
+
+def load_merchant_dashboard(
+    db: Session,
+    merchant_id: int,
+    start_day: date,
+    end_day: date,
+    granularity: str = "day",
+    top_limit: int = 10
+) -> Dict:
+    """
+    计算商家数据看板
+    
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID
+        start_day: 起始日期
+        end_day: 结束日期（包含）
+        granularity: 趋势的统计粒度（day / week / month）
+        top_limit: 热销商品数量
+    
+    Returns:
+        {"trend": 销售趋势, "top_products": 热销商品, "category_distribution": 类目分布, "kpis": 核心指标}
+    """
+    starts = bucket_starts(start_day, end_day, granularity)
+    
+    # 唯一一次扫描：汇总表主键即 (商品, 日期)，无需再分组；周 / 月趋势从首个桶起点开始读
+    rows = db.query(
+        DailyProductSales.product_id,
+        Product.name,
+        DailyProductSales.category,
+        DailyProductSales.sale_date,
+        DailyProductSales.quantity,
+        DailyProductSales.revenue,
+        DailyProductSales.order_count
+    ).outerjoin(
+        Product, Product.product_id == DailyProductSales.product_id
+    ).filter(
+        DailyProductSales.merchant_id == merchant_id,
+        DailyProductSales.sale_date >= starts[0].astype("datetime64[D]").item(),
+        DailyProductSales.sale_date <= end_day
+    ).all()
+    
+    times = np.array([row[3] for row in rows], dtype="datetime64[D]")
+    quantities = np.array([float(row[4] or 0) for row in rows])
+    revenues = np.array([float(row[5] or 0) for row in rows])
+    counts = np.array([float(row[6] or 0) for row in rows])
+    trend = fill_series(starts, granularity, times, counts, quantities, revenues)
+    
+    # 其余统计只取所选日期范围内的行
+    in_range = np.flatnonzero(times >= np.datetime64(start_day, "D"))
+    rows = [rows[index] for index in in_range]
+    quantities, revenues, counts = quantities[in_range], revenues[in_range], counts[in_range]
+    
+    top_products, category_distribution = [], []
+    if rows:
+        product_ids, product_sales = _group_sum([row[0] for row in rows], quantities)
+        names = {row[0]: row[1] for row in rows}
+        # 销量降序，同销量按商品ID升序
+        order = np.lexsort((product_ids.astype(np.int64), -product_sales))[:top_limit]
+        top_products = [
+            {
+                "product_id": int(product_ids[index]),
+                "name": names[product_ids[index]] or "已删除商品",
+                "sales": int(product_sales[index])
+            }
+            for index in order if product_sales[index] > 0
+        ]
+        
+        categories, category_sales = _group_sum([row[2] or "未分类" for row in rows], quantities)
+        category_distribution = [
+            {"name": category, "value": int(value)}
+            for category, value in zip(categories, category_sales) if value > 0
+        ]
+    
+    gmv = float(revenues.sum())
+    order_count = int(counts.sum())
+    kpis = {
+        "gmv": round(gmv, 2),
+        "order_count": order_count,
+        "aov": round(gmv / order_count, 2) if order_count else 0.0,
+        "sales": int(quantities.sum())
+    }
+    
+    return {
+        "start_date": str(start_day),
+        "end_date": str(end_day),
+        "trend": {"granularity": granularity, **trend},
+        "top_products": top_products,
+        "category_distribution": category_distribution,
+        "kpis": kpis
+    }
@@ -0,0 +1,193 @@
+"""
+订单与销量数据导出服务
+用服务端游标分批读取（yield_per），逐批编码为 CSV / NDJSON 并可选 gzip 压缩，
+生成器产出字节块供 StreamingResponse 发送，内存占用与导出行数无关
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from config import settings
+from database import SessionLocal
+from models import Order, User, Product, DailyProductSales
+
+# 支持的导出格式与数据集
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_DATASETS = ("orders", "sales")
+
+
+def _orders_statement(merchant_id: int, start_day: Optional[date], end_day: Optional[date], status: Optional[str]):
+    """订单明细：按下单时间范围过滤（可使用 idx_merchant_time 索引），关联买家名与商品名"""
+    statement = select(
+        Order.order_id,
+        Order.order_time,
+        User.username,
+        Order.product_id,
+        Product.name,
+        Order.quantity,
+        Order.unit_price,
+        Order.total_amount,
+        Order.status
+    ).outerjoin(
+        User, User.user_id == Order.user_id
+    ).outerjoin(
+        Product, Product.product_id == Order.product_id
+    ).where(Order.merchant_id == merchant_id)
+    if start_day is not None:
+        statement = statement.where(Order.order_time >= datetime.combine(start_day, datetime.min.time()))
+    if end_day is not None:
+        statement = statement.where(
+            Order.order_time < datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+        )
+    if status:
+        statement = statement.where(Order.status == status)
+    return statement.order_by(Order.order_time, Order.order_id)
+
+
+def _sales_statement(merchant_id: int, start_day: Optional[date], end_day: Optional[date], status: Optional[str]):
+    """商品日销量：读取日销量汇总表（不区分订单状态），跳过订单全部取消后归零的汇总行"""
+    statement = select(
+        DailyProductSales.sale_date,
+        DailyProductSales.product_id,
+        Product.name,
+        DailyProductSales.category,
+        DailyProductSales.quantity,
+        DailyProductSales.revenue,
+        DailyProductSales.order_count
+    ).outerjoin(
+        Product, Product.product_id == DailyProductSales.product_id
+    ).where(
+        DailyProductSales.merchant_id == merchant_id,
+        DailyProductSales.order_count > 0
+    )
+    if start_day is not None:
+        statement = statement.where(DailyProductSales.sale_date >= start_day)
+    if end_day is not None:
+        statement = statement.where(DailyProductSales.sale_date <= end_day)
+    return statement.order_by(DailyProductSales.sale_date, DailyProductSales.product_id)
+
+
+# {数据集: (表头, 查询构造函数)}
+_DATASETS = {
+    "orders": (
+        ["order_id", "order_time", "buyer_username", "product_id", "product_name",
+         "quantity", "unit_price", "total_amount", "status"],
+        _orders_statement
+    ),
+    "sales": (
+        ["sale_date", "product_id", "product_name", "category", "quantity", "revenue", "order_count"],
+        _sales_statement
+    ),
+}
+
+
+def _iter_batches(
+    dataset: str,
+    merchant_id: int,
+    start_day: Optional[date],
+    end_day: Optional[date],
+    status: Optional[str]
+) -> Iterator[Sequence[Tuple]]:
+    """
+    用服务端游标分批读取导出数据
+    
+    生成器自己打开并关闭数据库会话：响应开始发送时，请求依赖注入的会话已经关闭
+    """
+    batch_size = settings.EXPORT_BATCH_SIZE
+    statement = _DATASETS[dataset][1](merchant_id, start_day, end_day, status)
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+
+def _csv_value(value):
+    """CSV单元格：时间用ISO格式，金额保留原始精度"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def _json_default(value):
+    """NDJSON字段中JSON不支持的类型：时间用ISO格式，金额转为数字"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def _encode_csv(headers: List[str], batches: Iterator[Sequence[Tuple]]) -> Iterator[bytes]:
+    """编码为CSV，首块带UTF-8 BOM便于Excel识别中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(headers: List[str], batches: Iterator[Sequence[Tuple]]) -> Iterator[bytes]:
+    """编码为NDJSON，每行一个JSON对象"""
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=_json_default) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """流式gzip压缩"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(
+    merchant_id: int,
+    dataset: str = "orders",
+    export_format: str = "csv",
+    compress: bool = False,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    status: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    按批产出导出文件内容
+    
+    Args:
+        merchant_id: 商家ID
+        dataset: 数据集（orders=订单明细，sales=商品日销量）
+        export_format: 导出格式（csv / ndjson）
+        compress: 是否gzip压缩
+        start_day: 起始日期，None表示不限
+        end_day: 结束日期（包含），None表示不限
+        status: 订单状态筛选，仅订单明细有效
+    
+    Returns:
+        字节块生成器
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"不支持的导出数据集: {dataset}")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {export_format}")
+    
+    headers = _DATASETS[dataset][0]
+    batches = _iter_batches(dataset, merchant_id, start_day, end_day, status)
+    chunks = _encode_csv(headers, batches) if export_format == "csv" else _encode_ndjson(headers, batches)
+    return _gzip(chunks) if compress else chunks
@@ -0,0 +1,141 @@
+"""
+列表分页工具
+支持页码分页与游标（keyset）分页：游标编码上一页最后一行的 (排序时间, 主键)，
+下一页按 (时间, 主键) < 游标 定位，配合 (筛选列, 时间) 组合索引，深翻页与首页开销相同；
+总数可选返回，并按查询条件短时缓存
+"""
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, desc, or_
+from sqlalchemy.orm import Query as ORMQuery
+
+from config import settings
+
+# 总数缓存：{缓存键: (过期时间, 总数)}
+_count_cache: Dict[Hashable, Tuple[float, int]] = {}
+_count_cache_lock = threading.Lock()
+
+# 缓存条目上限，超过后清理过期条目
+_COUNT_CACHE_MAX_ENTRIES = 10000
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """
+    把 (排序时间, 主键) 编码为不透明的游标字符串
+    
+    Args:
+        sort_value: 排序时间
+        row_id: 主键
+    
+    Returns:
+        URL安全的base64字符串
+    """
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析游标字符串
+    
+    Args:
+        cursor: encode_cursor 生成的游标
+    
+    Returns:
+        (排序时间, 主键)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+def paginate(
+    query: ORMQuery,
+    time_column,
+    id_column,
+    page: int,
+    size: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (时间, 主键) 倒序取一页数据
+    
+    Args:
+        query: 已加好筛选条件的查询
+        time_column: 排序时间列，如 Order.order_time
+        id_column: 主键列，如 Order.order_id
+        page: 页码，传入游标时忽略
+        size: 每页数量
+        cursor: 上一页返回的游标，None表示按页码分页
+    
+    Returns:
+        (本页数据, 下一页游标)，没有下一页时游标为None
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        # (时间, 主键) < (游标时间, 游标主键)；冗余的 时间 <= 游标时间 条件让 MySQL 能用组合索引做范围扫描，
+        # 仅有 OR 条件时优化器往往无法确定索引范围
+        query = query.filter(
+            time_column <= sort_value,
+            or_(
+                time_column < sort_value,
+                and_(time_column == sort_value, id_column < row_id)
+            )
+        )
+    
+    query = query.order_by(desc(time_column), desc(id_column))
+    if not cursor:
+        query = query.offset((page - 1) * size)
+    # 多取一行判断是否还有下一页
+    rows = query.limit(size + 1).all()
+    
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+
+def count_total(query: ORMQuery, cache_key: Hashable) -> int:
+    """
+    查询总数，结果按缓存键缓存 PAGINATION_COUNT_CACHE_SECONDS 秒
+    
+    Args:
+        query: 已加好筛选条件的查询
+        cache_key: 唯一标识筛选条件的缓存键
+    
+    Returns:
+        总数
+    """
+    ttl = settings.PAGINATION_COUNT_CACHE_SECONDS
+    now = time.monotonic()
+    if ttl > 0:
+        with _count_cache_lock:
+            cached = _count_cache.get(cache_key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+    
+    total = query.count()
+    
+    if ttl > 0:
+        with _count_cache_lock:
+            if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+                for key in [key for key, (expires, _) in _count_cache.items() if expires <= now]:
+                    del _count_cache[key]
+                if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+                    _count_cache.clear()
+            _count_cache[cache_key] = (now + ttl, total)
+    return total
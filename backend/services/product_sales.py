@@ -0,0 +1,78 @@
+"""
+商品销量计数服务
+维护 products 表上的 sales_count / order_count 冗余计数：
+下单、取消订单时在同一事务内原子增减，对账任务从订单表批量重算（jobs/reconcile_product_sales.py）
+"""
+from typing import Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models import Order, Product
+
+# 不计入销量的订单状态
+CANCELLED_STATUS = "cancelled"
+
+
+def update_sales_counters(db: Session, product_id: int, quantity: int, sign: int = 1):
+    """
+    增减商品销量计数（随调用方事务一起提交）
+    使用 SQL 表达式自增，并发下单不会丢失更新
+    
+    Args:
+        db: 数据库会话
+        product_id: 商品ID
+        quantity: 订单购买数量
+        sign: 1表示新增订单，-1表示取消订单
+    """
+    db.execute(
+        update(Product).where(Product.product_id == product_id).values(
+            sales_count=Product.sales_count + sign * quantity,
+            order_count=Product.order_count + sign
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_sales_counters(db: Session, batch_size: Optional[int] = None) -> Dict:
+    """
+    按商品ID分批，用订单表的聚合结果覆盖商品销量计数
+    
+    Args:
+        db: 数据库会话
+        batch_size: 每批商品数，默认1000
+    
+    Returns:
+        运行统计（处理商品数、修正商品数）
+    """
+    batch_size = batch_size or 1000
+    live_orders = (Order.product_id == Product.product_id) & (Order.status != CANCELLED_STATUS)
+    sales = select(func.coalesce(func.sum(Order.quantity), 0)).where(live_orders).scalar_subquery()
+    orders = select(func.count(Order.order_id)).where(live_orders).scalar_subquery()
+    
+    products_done = corrected = 0
+    last_id = 0
+    while True:
+        end_id = db.query(Product.product_id).filter(
+            Product.product_id > last_id
+        ).order_by(Product.product_id).offset(batch_size - 1).limit(1).scalar()
+        if end_id is None:
+            end_id = db.query(func.max(Product.product_id)).filter(Product.product_id > last_id).scalar()
+        if end_id is None:
+            break
+        
+        in_batch = (Product.product_id > last_id) & (Product.product_id <= end_id)
+        products_done += db.query(func.count(Product.product_id)).filter(in_batch).scalar()
+        # 只更新计数不一致的商品
+        corrected += db.execute(
+            update(Product).where(
+                in_batch,
+                (Product.sales_count != sales) | (Product.order_count != orders)
+            ).values(
+                sales_count=sales,
+                order_count=orders
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        last_id = end_id
+    
+    return {"products": products_done, "corrected": corrected}
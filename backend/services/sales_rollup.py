@@ -0,0 +1,277 @@
+"""
+商品日销量汇总服务
+维护 daily_product_sales 汇总表，支持两种更新方式（SALES_ROLLUP_MODE）：
+- sync：下单时在同一事务内累加当天汇总行
+- catchup：由追补任务按订单ID高水位批量汇总新订单（jobs/rollup_sales.py），
+  只汇总下单时间早于 SALES_ROLLUP_LAG_SECONDS 秒前的订单：订单ID在写入时分配，
+  并发事务可能晚于ID更大的订单提交，等待一段时间后高水位之前的订单才都已提交
+首次部署或切换方式时先运行一次 python -m jobs.rollup_sales --rebuild
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Order, Product, DailyProductSales, SalesRollupState
+from ai.advisor import mark_products_dirty
+from services.product_sales import CANCELLED_STATUS
+
+# 高水位记录名
+ROLLUP_NAME = "daily_product_sales"
+
+
+def _upsert_statement(db: Session, rows: List[Dict]):
+    """
+    构造"插入，主键冲突时累加"的语句，按数据库方言选择实现
+    
+    Args:
+        db: 数据库会话
+        rows: 汇总行，quantity / revenue / order_count 为增量
+    """
+    table = DailyProductSales.__table__
+    dialect = db.get_bind().dialect.name
+    
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).values(rows)
+        return statement.on_duplicate_key_update(
+            quantity=table.c.quantity + statement.inserted.quantity,
+            revenue=table.c.revenue + statement.inserted.revenue,
+            order_count=table.c.order_count + statement.inserted.order_count
+        )
+    
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"不支持的数据库: {dialect}")
+    statement = insert(table).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.product_id, table.c.sale_date],
+        set_={
+            "quantity": table.c.quantity + statement.excluded.quantity,
+            "revenue": table.c.revenue + statement.excluded.revenue,
+            "order_count": table.c.order_count + statement.excluded.order_count
+        }
+    )
+
+
+def _lag_cutoff(db: Session, lag_seconds: int):
+    """
+    构造"数据库当前时间减去等待窗口"的SQL表达式，按数据库方言选择实现
+    下单时间由数据库默认值写入，截止时间使用同一时钟，不受应用服务器时钟偏差影响
+    
+    Args:
+        db: 数据库会话
+        lag_seconds: 等待窗口（秒）
+    """
+    lag_seconds = int(lag_seconds)
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        return func.now() - literal_column(f"INTERVAL {lag_seconds} SECOND")
+    if dialect == "postgresql":
+        return func.now() - literal_column(f"INTERVAL '{lag_seconds} seconds'")
+    if dialect == "sqlite":
+        return func.datetime("now", f"-{lag_seconds} seconds")
+    raise NotImplementedError(f"不支持的数据库: {dialect}")
+
+
+def record_order_sale(db: Session, order: Order, category: Optional[str], sign: int = 1):
+    """
+    把一笔订单累加到汇总表（随调用方事务一起提交）
+    catchup 模式下新订单由追补任务处理，这里只扣减已汇总订单的取消
+    
+    Args:
+        db: 数据库会话
+        order: 已flush、拥有订单ID的订单
+        category: 商品类目
+        sign: 1表示新增订单，-1表示撤销订单
+    """
+    if settings.SALES_ROLLUP_MODE != "sync":
+        # 追补模式下，已汇总的订单被取消时需要在这里扣减（高水位之前的订单提交后才会被汇总，必定已汇总）；
+        # 尚未汇总的订单由追补任务按状态排除（锁住高水位，避免与正在运行的追补批次交错）
+        if sign > 0 or order.order_id > _get_state(db).last_order_id:
+            return
+    else:
+        # 同步重建在一个事务内清空并重新汇总，期间持有高水位行的排他锁；下单事务在提交前取得共享锁，
+        # 订单要么在重建前提交、由重建汇总，要么等重建提交后再累加，不会被两边同时计入
+        db.query(SalesRollupState.name).filter(
+            SalesRollupState.name == ROLLUP_NAME
+        ).with_for_update(read=True).first()
+    
+    # 日期取订单实际写入的下单时间（数据库默认值），避免应用与数据库时钟不一致
+    sale_date = select(func.date(Order.order_time)).where(
+        Order.order_id == order.order_id
+    ).scalar_subquery()
+    
+    db.execute(_upsert_statement(db, [{
+        "product_id": order.product_id,
+        "sale_date": sale_date,
+        "merchant_id": order.merchant_id,
+        "category": category,
+        "quantity": sign * order.quantity,
+        "revenue": sign * order.total_amount,
+        "order_count": sign
+    }]))
+
+
+def update_product_category(db: Session, product_id: int, category: Optional[str]):
+    """
+    商品类目变更后同步修改其历史汇总行，使类目分布按商品当前类目统计
+    
+    Args:
+        db: 数据库会话
+        product_id: 商品ID
+        category: 新类目
+    """
+    db.query(DailyProductSales).filter(
+        DailyProductSales.product_id == product_id
+    ).update({DailyProductSales.category: category}, synchronize_session=False)
+
+
+def _get_state(db: Session) -> SalesRollupState:
+    """读取（必要时创建）汇总高水位，并加行锁防止多个追补任务并发"""
+    state = db.query(SalesRollupState).filter(
+        SalesRollupState.name == ROLLUP_NAME
+    ).with_for_update().first()
+    if state is None:
+        state = SalesRollupState(name=ROLLUP_NAME, last_order_id=0, updated_at=datetime.now())
+        db.add(state)
+        db.flush()
+    return state
+
+
+def catch_up(
+    db: Session,
+    batch_size: Optional[int] = None,
+    lag_seconds: Optional[int] = None,
+    commit: bool = True
+) -> Dict:
+    """
+    从高水位开始，按订单ID分批汇总新订单并推进高水位
+    每批的汇总与高水位更新在同一事务内提交，中断后可从断点继续
+    
+    Args:
+        db: 数据库会话
+        batch_size: 每批订单数，默认读取配置 SALES_ROLLUP_BATCH_SIZE
+        lag_seconds: 只汇总下单时间早于该秒数的订单，默认读取配置 SALES_ROLLUP_LAG_SECONDS
+        commit: 是否逐批提交；为False时全部批次留在调用方的事务中，高水位行锁一直持有
+    
+    Returns:
+        运行统计（处理订单数、写入汇总行数、当前高水位）
+    """
+    batch_size = batch_size or settings.SALES_ROLLUP_BATCH_SIZE
+    if lag_seconds is None:
+        lag_seconds = settings.SALES_ROLLUP_LAG_SECONDS
+    orders_done = rows_done = 0
+    
+    # 高水位不越过第一个下单时间仍在等待窗口内的订单：ID更小、尚未提交的订单下单时间也在窗口内；
+    # 不等待时直接汇总目前已提交的全部订单
+    state = _get_state(db)
+    blocker_id = None
+    if lag_seconds > 0:
+        blocker_id = db.query(func.min(Order.order_id)).filter(
+            Order.order_id > state.last_order_id,
+            Order.order_time >= _lag_cutoff(db, lag_seconds)
+        ).scalar()
+    if commit:
+        db.commit()
+    
+    while True:
+        state = _get_state(db)
+        start_id = state.last_order_id
+        pending = [Order.order_id > start_id]
+        if blocker_id is not None:
+            pending.append(Order.order_id < blocker_id)
+        # 本批的最后一个订单ID（订单ID可能不连续，按主键顺序取第 batch_size 个）
+        end_id = db.query(Order.order_id).filter(
+            *pending
+        ).order_by(Order.order_id).offset(batch_size - 1).limit(1).scalar()
+        if end_id is None:
+            end_id = db.query(func.max(Order.order_id)).filter(*pending).scalar()
+        if end_id is None:
+            if commit:
+                db.commit()
+            break
+        
+        sale_date = func.date(Order.order_time)
+        aggregated = db.query(
+            Order.product_id,
+            sale_date,
+            Order.merchant_id,
+            Product.category,
+            func.sum(Order.quantity),
+            func.sum(Order.total_amount),
+            func.count(Order.order_id)
+        ).join(
+            Product, Product.product_id == Order.product_id
+        ).filter(
+            Order.order_id > start_id,
+            Order.order_id <= end_id,
+            Order.status != CANCELLED_STATUS
+        ).group_by(
+            Order.product_id, sale_date, Order.merchant_id, Product.category
+        ).all()
+        
+        rows = [
+            {
+                "product_id": product_id,
+                "sale_date": day if isinstance(day, date) else date.fromisoformat(str(day)[:10]),
+                "merchant_id": merchant_id,
+                "category": category,
+                "quantity": int(quantity or 0),
+                "revenue": Decimal(str(revenue or 0)),
+                "order_count": int(count)
+            }
+            for product_id, day, merchant_id, category, quantity, revenue, count in aggregated
+        ]
+        if rows:
+            db.execute(_upsert_statement(db, rows))
+            # 汇总落后于下单，商品建议需在汇总更新后重新评估
+            products_by_merchant: Dict[int, set] = {}
+            for row in rows:
+                products_by_merchant.setdefault(row["merchant_id"], set()).add(row["product_id"])
+            for merchant_id, product_ids in products_by_merchant.items():
+                mark_products_dirty(db, merchant_id, product_ids)
+        
+        orders_done += sum(row["order_count"] for row in rows)
+        rows_done += len(rows)
+        state.last_order_id = end_id
+        state.updated_at = datetime.now()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+    
+    return {"orders": orders_done, "rows": rows_done, "last_order_id": _get_state(db).last_order_id}
+
+
+def rebuild(db: Session, batch_size: Optional[int] = None) -> Dict:
+    """
+    清空汇总表并从头重新汇总全部订单
+    首次部署、切换汇总方式或修复数据时使用
+    
+    Args:
+        db: 数据库会话
+        batch_size: 每批订单数
+    
+    Returns:
+        运行统计
+    """
+    state = _get_state(db)
+    db.query(DailyProductSales).delete(synchronize_session=False)
+    state.last_order_id = 0
+    state.updated_at = datetime.now()
+    if settings.SALES_ROLLUP_MODE != "sync":
+        db.commit()
+        return catch_up(db, batch_size)
+    
+    # 同步模式下新订单在下单事务内汇总：在同一事务内汇总目前已提交的全部订单，
+    # 提交前一直持有高水位行锁，期间的下单事务等待重建完成后再累加（见 record_order_sale）
+    stats = catch_up(db, batch_size, lag_seconds=0, commit=False)
+    db.commit()
+    return stats
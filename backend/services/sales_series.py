@@ -0,0 +1,155 @@
+"""
+销售时间序列服务
+按小时 / 天 / 周 / 月分桶统计商家（或单个商品）的订单数、销量与销售额：
+天及以上粒度读取日销量汇总表，小时粒度按下单时间范围读取订单（可使用 idx_merchant_time 索引），
+桶序列与补零均用numpy一次完成
+"""
+import numpy as np
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Order, DailyProductSales
+from services.product_sales import CANCELLED_STATUS
+
+# 支持的统计粒度
+GRANULARITIES = ("hour", "day", "week", "month")
+
+# 小时粒度最多统计的天数
+MAX_HOUR_DAYS = 31
+
+
+def bucket_starts(start_day: date, end_day: date, granularity: str) -> np.ndarray:
+    """
+    覆盖 [start_day, end_day] 的全部桶起点
+    周桶从周一开始，月桶从1号开始，首个桶可能早于 start_day
+    
+    Args:
+        start_day: 起始日期
+        end_day: 结束日期（包含）
+        granularity: 统计粒度
+    
+    Returns:
+        桶起点数组（numpy datetime64）
+    """
+    if granularity == "hour":
+        return np.arange(np.datetime64(start_day, "h"), np.datetime64(end_day + timedelta(days=1), "h"))
+    if granularity == "month":
+        return np.arange(np.datetime64(start_day, "M"), np.datetime64(end_day, "M") + 1)
+    
+    first, last = np.datetime64(start_day, "D"), np.datetime64(end_day, "D")
+    if granularity == "week":
+        # 1970-01-01 是周四，(天数 + 3) % 7 即距离周一的天数
+        first = first - (first.astype(np.int64) + 3) % 7
+        return np.arange(first, last + 1, 7)
+    return np.arange(first, last + 1)
+
+
+def _bucket_sum(starts: np.ndarray, times: np.ndarray, values: List[np.ndarray]) -> List[np.ndarray]:
+    """把事件按时间落入的桶求和，没有事件的桶为0"""
+    if len(times) == 0:
+        return [np.zeros(len(starts)) for _ in values]
+    index = np.searchsorted(starts.astype(times.dtype), times, side="right") - 1
+    return [np.bincount(index, weights=value, minlength=len(starts)) for value in values]
+
+
+def _bucket_labels(starts: np.ndarray, granularity: str) -> List[str]:
+    """桶的显示标签：小时为 YYYY-MM-DD HH:00，天与周为 YYYY-MM-DD，月为 YYYY-MM"""
+    if granularity == "hour":
+        return [label.replace("T", " ") + ":00" for label in np.datetime_as_string(starts, unit="h")]
+    return np.datetime_as_string(starts).tolist()
+
+
+def load_sales_series(
+    db: Session,
+    merchant_id: int,
+    start_day: date,
+    end_day: date,
+    granularity: str = "day",
+    product_id: Optional[int] = None
+) -> Dict[str, list]:
+    """
+    统计商家在一段日期内按粒度分桶的销售数据
+    
+    Args:
+        db: 数据库会话
+        merchant_id: 商家ID
+        start_day: 起始日期
+        end_day: 结束日期（包含）
+        granularity: 统计粒度（hour / day / week / month）
+        product_id: 只统计该商品，None表示商家全部商品
+    
+    Returns:
+        {"dates": 桶标签, "sales": 订单数, "quantity": 销量, "revenue": 销售额}
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"不支持的统计粒度: {granularity}")
+    starts = bucket_starts(start_day, end_day, granularity)
+    
+    if granularity == "hour":
+        # 原始订单的下单时间范围条件，不对列做函数运算
+        query = db.query(Order.order_time, Order.quantity, Order.total_amount).filter(
+            Order.merchant_id == merchant_id,
+            Order.order_time >= datetime.combine(start_day, datetime.min.time()),
+            Order.order_time < datetime.combine(end_day + timedelta(days=1), datetime.min.time()),
+            Order.status != CANCELLED_STATUS
+        )
+        if product_id is not None:
+            query = query.filter(Order.product_id == product_id)
+        rows = query.all()
+        times = np.array([row[0] for row in rows], dtype="datetime64[s]")
+        counts = np.ones(len(rows))
+    else:
+        # 首个周 / 月桶从桶起点开始统计，保证每个桶都是完整的
+        query = db.query(
+            DailyProductSales.sale_date,
+            func.sum(DailyProductSales.quantity),
+            func.sum(DailyProductSales.revenue),
+            func.sum(DailyProductSales.order_count)
+        ).filter(
+            DailyProductSales.merchant_id == merchant_id,
+            DailyProductSales.sale_date >= starts[0].astype("datetime64[D]").item(),
+            DailyProductSales.sale_date <= end_day
+        )
+        if product_id is not None:
+            query = query.filter(DailyProductSales.product_id == product_id)
+        rows = query.group_by(DailyProductSales.sale_date).all()
+        times = np.array([row[0] for row in rows], dtype="datetime64[D]")
+        counts = np.array([float(row[3] or 0) for row in rows])
+    
+    quantities = np.array([float(row[1] or 0) for row in rows])
+    revenues = np.array([float(row[2] or 0) for row in rows])
+    return fill_series(starts, granularity, times, counts, quantities, revenues)
+
+
+def fill_series(
+    starts: np.ndarray,
+    granularity: str,
+    times: np.ndarray,
+    counts: np.ndarray,
+    quantities: np.ndarray,
+    revenues: np.ndarray
+) -> Dict[str, list]:
+    """
+    把按时间记录的订单数、销量、销售额落入桶中求和，没有数据的桶为0
+    
+    Args:
+        starts: bucket_starts 生成的桶起点
+        granularity: 统计粒度
+        times: 每条记录的时间（numpy datetime64）
+        counts: 每条记录的订单数
+        quantities: 每条记录的销量
+        revenues: 每条记录的销售额
+    
+    Returns:
+        {"dates": 桶标签, "sales": 订单数, "quantity": 销量, "revenue": 销售额}
+    """
+    counts, quantities, revenues = _bucket_sum(starts, times, [counts, quantities, revenues])
+    return {
+        "dates": _bucket_labels(starts, granularity),
+        "sales": counts.astype(np.int64).tolist(),
+        "quantity": quantities.astype(np.int64).tolist(),
+        "revenue": np.round(revenues, 2).tolist()
+    }
@@ -6,6 +6,11 @@ CREATE DATABASE IF NOT EXISTS online_mall CHARACTER SET utf8mb4 COLLATE utf8mb4_
 USE online_mall;
 
 -- 删除已存在的表（按依赖关系倒序删除）
+DROP TABLE IF EXISTS sales_rollup_state;
+DROP TABLE IF EXISTS daily_product_sales;
+DROP TABLE IF EXISTS advisor_dirty_products;
+DROP TABLE IF EXISTS merchant_suggestions;
+DROP TABLE IF EXISTS user_recommendations;
 DROP TABLE IF EXISTS orders;
 DROP TABLE IF EXISTS products;
 DROP TABLE IF EXISTS merchants;
@@ -52,11 +57,16 @@ CREATE TABLE products (
     stock INT DEFAULT 0 COMMENT '库存数量',
     category VARCHAR(50) DEFAULT NULL COMMENT '商品类目',
     status TINYINT DEFAULT 1 COMMENT '1=上架, 2=下架',
+    sales_count INT NOT NULL DEFAULT 0 COMMENT '累计销量（不含已取消订单）',
+    order_count INT NOT NULL DEFAULT 0 COMMENT '累计订单数（不含已取消订单）',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     
     FOREIGN KEY (merchant_id) REFERENCES merchants(merchant_id) ON DELETE CASCADE,
     INDEX idx_merchant_status (merchant_id, status),
     INDEX idx_category_status (category, status),
+    INDEX idx_status_sales (status, sales_count),
+    INDEX idx_merchant_created (merchant_id, created_at),
+    INDEX idx_status_created (status, created_at),
     FULLTEXT INDEX ft_search (name, description),
     
     CONSTRAINT chk_price_positive CHECK (price > 0),
@@ -90,6 +100,76 @@ CREATE TABLE orders (
     CONSTRAINT chk_total_positive CHECK (total_amount > 0)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='订单表';
 
+-- ============================================
+-- 用户推荐结果表 (user_recommendations)
+-- 由离线任务 jobs/precompute_recommendations.py 批量写入
+-- ============================================
+CREATE TABLE user_recommendations (
+    user_id BIGINT PRIMARY KEY COMMENT '用户ID',
+    product_ids TEXT NOT NULL COMMENT '推荐商品ID，逗号分隔，按分数降序',
+    scores TEXT NOT NULL COMMENT '推荐分数，逗号分隔，与商品ID一一对应',
+    model_version VARCHAR(32) NOT NULL COMMENT '生成结果的模型版本',
+    generated_at DATETIME NOT NULL COMMENT '生成时间',
+    
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户推荐结果表';
+
+-- ============================================
+-- 商家经营建议结果表 (merchant_suggestions)
+-- 由离线任务 jobs/precompute_suggestions.py 批量写入
+-- ============================================
+CREATE TABLE merchant_suggestions (
+    merchant_id BIGINT PRIMARY KEY COMMENT '商家ID',
+    suggestions MEDIUMTEXT NOT NULL COMMENT '建议列表JSON，按优先级排序',
+    suggestion_count INT NOT NULL DEFAULT 0 COMMENT '建议条数',
+    generated_at DATETIME NOT NULL COMMENT '生成时间',
+    window_date DATE NOT NULL COMMENT '统计窗口对齐的日期',
+    category_prices TEXT NOT NULL COMMENT '计算时使用的类目均价JSON',
+    dirty_mark_id BIGINT NOT NULL DEFAULT 0 COMMENT '已处理的脏标记最大ID',
+    
+    FOREIGN KEY (merchant_id) REFERENCES merchants(merchant_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='商家经营建议结果表';
+
+-- ============================================
+-- 经营建议脏标记表 (advisor_dirty_products)
+-- 下单、修改商品时追加，增量计算建议时按商家读取
+-- ============================================
+CREATE TABLE advisor_dirty_products (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '标记ID',
+    merchant_id BIGINT NOT NULL COMMENT '商家ID',
+    product_id BIGINT NOT NULL COMMENT '商品ID',
+    marked_at DATETIME NOT NULL COMMENT '标记时间',
+    
+    INDEX idx_merchant_mark (merchant_id, id),
+    INDEX idx_merchant_marked_at (merchant_id, marked_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='经营建议脏标记表';
+
+-- ============================================
+-- 商品日销量汇总表 (daily_product_sales)
+-- 下单事务内累加，或由 jobs/rollup_sales.py 按高水位追补
+-- ============================================
+CREATE TABLE daily_product_sales (
+    product_id BIGINT NOT NULL COMMENT '商品ID',
+    sale_date DATE NOT NULL COMMENT '销售日期',
+    merchant_id BIGINT NOT NULL COMMENT '商家ID',
+    category VARCHAR(50) COMMENT '商品类目',
+    quantity INT NOT NULL DEFAULT 0 COMMENT '销量',
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00 COMMENT '销售额',
+    order_count INT NOT NULL DEFAULT 0 COMMENT '订单数',
+    
+    PRIMARY KEY (product_id, sale_date),
+    INDEX idx_merchant_date (merchant_id, sale_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='商品日销量汇总表';
+
+-- ============================================
+-- 汇总任务进度表 (sales_rollup_state)
+-- ============================================
+CREATE TABLE sales_rollup_state (
+    name VARCHAR(50) PRIMARY KEY COMMENT '汇总表名',
+    last_order_id BIGINT NOT NULL DEFAULT 0 COMMENT '已汇总的最大订单ID',
+    updated_at DATETIME NOT NULL COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='汇总任务进度表';
+
 -- ============================================
 -- 触发器：确保订单总金额正确
 -- ============================================
@@ -120,6 +120,22 @@ INSERT INTO orders (user_id, product_id, merchant_id, quantity, unit_price, stat
 (2, 3, 1, 1, 129.00, 'completed', '2025-12-22 15:30:00'),
 (3, 23, 4, 1, 168.00, 'completed', '2025-12-23 10:40:00');
 
+-- ============================================
+-- 初始化统计数据（与 jobs.reconcile_product_sales / jobs.rollup_sales --rebuild 结果一致）
+-- ============================================
+UPDATE products p SET
+    sales_count = (SELECT COALESCE(SUM(o.quantity), 0) FROM orders o WHERE o.product_id = p.product_id AND o.status != 'cancelled'),
+    order_count = (SELECT COUNT(*) FROM orders o WHERE o.product_id = p.product_id AND o.status != 'cancelled');
+
+INSERT INTO daily_product_sales (product_id, sale_date, merchant_id, category, quantity, revenue, order_count)
+SELECT o.product_id, DATE(o.order_time), o.merchant_id, p.category, SUM(o.quantity), SUM(o.total_amount), COUNT(*)
+FROM orders o JOIN products p ON p.product_id = o.product_id
+WHERE o.status != 'cancelled'
+GROUP BY o.product_id, DATE(o.order_time), o.merchant_id, p.category;
+
+INSERT INTO sales_rollup_state (name, last_order_id, updated_at)
+SELECT 'daily_product_sales', COALESCE(MAX(order_id), 0), NOW() FROM orders;
+
 -- ============================================
 -- 验证数据插入
 -- ============================================
@@ -25,6 +25,11 @@ export const getOrders = (params) => {
   return request.get('/api/merchant/orders', { params })
 }
 
+// 获取数据看板（趋势、Top商品、类目分布、核心指标、AI建议）
+export const getDashboard = (params) => {
+  return request.get('/api/merchant/dashboard', { params })
+}
+
 // 获取销售趋势
 export const getSalesTrend = (params) => {
   return request.get('/api/merchant/sales/trend', { params })
@@ -0,0 +1,254 @@
+"""
+推荐引擎性能基准与离线评估脚本
+生成可配置规模的合成用户/商品/订单数据（商品热度服从幂律分布），
+分阶段统计耗时与内存峰值，并按时间切分留出集计算 precision@k / recall@k
+
+无需数据库，直接运行：
+    python tests/benchmark_recommender.py --users 20000 --products 5000 --orders 300000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+from typing import Dict, Tuple
+
+# 基准不读写数据库，但导入后端模块时会创建数据库引擎，使用内存SQLite避免依赖MySQL驱动
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "false")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from ai.recommender import RecommendationEngine
+from ai.als import ALSRecommendationEngine
+
+# 提前导入，避免把首次导入sklearn的开销计入"计算近邻"阶段
+import sklearn.preprocessing  # noqa: F401
+
+
+def generate_synthetic_orders(
+    n_users: int,
+    n_products: int,
+    n_orders: int,
+    alpha: float = 1.1,
+    days: int = 180,
+    seed: int = 42
+) -> Dict[str, np.ndarray]:
+    """
+    生成合成订单数据
+    
+    商品热度与用户活跃度都服从幂律分布（第r名的概率 ∝ 1/r^alpha），
+    每个用户偏好少数几个类目，使购买行为具有可学习的相关性
+    
+    Args:
+        n_users: 用户数
+        n_products: 商品数
+        n_orders: 订单数
+        alpha: 幂律指数，越大头部越集中
+        days: 订单时间跨度（天）
+        seed: 随机种子
+    
+    Returns:
+        包含 user_id / product_id / order_time（距起点的秒数）数组的字典
+    """
+    rng = np.random.default_rng(seed)
+    
+    def _power_law(size: int) -> np.ndarray:
+        weights = 1.0 / np.arange(1, size + 1) ** alpha
+        return weights / weights.sum()
+    
+    # 商品按类目分组，用户偏好1~3个类目
+    n_categories = max(1, n_products // 200)
+    product_category = rng.integers(0, n_categories, size=n_products)
+    products_by_category = [np.flatnonzero(product_category == c) for c in range(n_categories)]
+    product_weights = _power_law(n_products)[rng.permutation(n_products)]
+    
+    user_ids = rng.choice(n_users, size=n_orders, p=_power_law(n_users)) + 1
+    user_categories = rng.integers(0, n_categories, size=(n_users + 1, 3))
+    
+    # 80% 订单来自用户偏好的类目，其余按全局热度随机
+    product_ids = np.empty(n_orders, dtype=np.int64)
+    from_preference = rng.random(n_orders) < 0.8
+    preferred = user_categories[user_ids, rng.integers(0, 3, size=n_orders)]
+    for category, members in enumerate(products_by_category):
+        mask = from_preference & (preferred == category)
+        if len(members) == 0 or not mask.any():
+            continue
+        weights = product_weights[members] / product_weights[members].sum()
+        product_ids[mask] = rng.choice(members, size=mask.sum(), p=weights)
+    product_ids[~from_preference] = rng.choice(n_products, size=(~from_preference).sum(), p=product_weights)
+    product_ids += 1
+    
+    order_time = np.sort(rng.uniform(0, days * 86400, size=n_orders))
+    return {"user_id": user_ids.astype(np.int64), "product_id": product_ids, "order_time": order_time}
+
+
+def time_split(orders: Dict[str, np.ndarray], holdout_ratio: float) -> Tuple[Dict, Dict]:
+    """
+    按下单时间切分训练集与留出集（最近 holdout_ratio 比例的订单为留出集）
+    
+    Args:
+        orders: 订单数组字典
+        holdout_ratio: 留出集比例
+    
+    Returns:
+        (训练集, 留出集)
+    """
+    cutoff = np.quantile(orders["order_time"], 1 - holdout_ratio)
+    train_mask = orders["order_time"] < cutoff
+    train = {key: value[train_mask] for key, value in orders.items()}
+    holdout = {key: value[~train_mask] for key, value in orders.items()}
+    return train, holdout
+
+
+def group_purchases(orders: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按 (用户, 商品) 聚合购买次数，等价于数据库中的 GROUP BY user_id, product_id
+    
+    Args:
+        orders: 订单数组字典
+    
+    Returns:
+        (user_ids, product_ids, purchase_counts)
+    """
+    pairs = np.stack([orders["user_id"], orders["product_id"]], axis=1)
+    unique_pairs, counts = np.unique(pairs, axis=0, return_counts=True)
+    return unique_pairs[:, 0], unique_pairs[:, 1], counts.astype(np.float32)
+
+
+def measure(label: str, results: Dict, func, *args, **kwargs):
+    """
+    执行一个阶段并记录耗时与Python堆内存峰值（含numpy数组分配）
+    
+    Args:
+        label: 阶段名称
+        results: 统计结果字典
+        func: 阶段函数
+    
+    Returns:
+        阶段函数的返回值
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results[label] = {"seconds": elapsed, "peak_mb": peak / 1024 / 1024}
+    return value
+
+
+def evaluate(model, train_pairs, holdout: Dict[str, np.ndarray], k: int, max_users: int, seed: int) -> Dict:
+    """
+    离线评估：对同时出现在训练集与留出集中的用户计算 precision@k / recall@k，
+    相关商品为留出期内新购买（训练期未购买过）的商品
+    
+    Args:
+        model: 已训练的模型快照
+        train_pairs: 训练集 (user_ids, product_ids, counts)
+        holdout: 留出集订单
+        k: 推荐列表长度
+        max_users: 最多评估的用户数
+        seed: 抽样随机种子
+    
+    Returns:
+        评估指标与单用户打分延迟
+    """
+    train_users, train_products, _ = train_pairs
+    order = np.argsort(train_users, kind="stable")
+    train_users, train_products = train_users[order], train_products[order]
+    boundaries = np.flatnonzero(np.diff(train_users)) + 1
+    history = dict(zip(train_users[np.r_[0, boundaries]], np.split(train_products, boundaries)))
+    
+    relevant = {}
+    for user_id, product_id in zip(holdout["user_id"], holdout["product_id"]):
+        relevant.setdefault(int(user_id), set()).add(int(product_id))
+    
+    candidates = [user_id for user_id in relevant if user_id in history]
+    rng = np.random.default_rng(seed)
+    if len(candidates) > max_users:
+        candidates = list(rng.choice(candidates, size=max_users, replace=False))
+    
+    precisions, recalls, latencies = [], [], []
+    for user_id in candidates:
+        purchased = history[user_id]
+        targets = relevant[user_id] - set(int(item) for item in purchased)
+        if not targets:
+            continue
+        
+        started = time.perf_counter()
+        recommended = model.recommend(purchased.tolist(), k, user_id=user_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+        
+        hits = len({product_id for product_id, _ in recommended} & targets)
+        precisions.append(hits / k)
+        recalls.append(hits / len(targets))
+    
+    if not latencies:
+        return {"users": 0}
+    return {
+        "users": len(latencies),
+        "precision": float(np.mean(precisions)),
+        "recall": float(np.mean(recalls)),
+        "latency_mean_ms": float(np.mean(latencies)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推荐引擎性能基准与离线评估")
+    parser.add_argument("--users", type=int, default=20000, help="用户数")
+    parser.add_argument("--products", type=int, default=5000, help="商品数")
+    parser.add_argument("--orders", type=int, default=300000, help="订单数")
+    parser.add_argument("--alpha", type=float, default=1.1, help="幂律指数")
+    parser.add_argument("--backend", choices=["itemcf", "als"], default="itemcf", help="推荐算法")
+    parser.add_argument("--top-k", type=int, default=50, help="每个商品保留的近邻数量（itemcf）")
+    parser.add_argument("--factors", type=int, default=64, help="因子数（als）")
+    parser.add_argument("--iterations", type=int, default=15, help="交替迭代轮数（als）")
+    parser.add_argument("--k", type=int, default=10, help="评估的推荐列表长度")
+    parser.add_argument("--holdout", type=float, default=0.2, help="按时间切分的留出集比例")
+    parser.add_argument("--eval-users", type=int, default=2000, help="最多评估的用户数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+    
+    stages = {}
+    orders = measure(
+        "生成数据", stages, generate_synthetic_orders,
+        args.users, args.products, args.orders, alpha=args.alpha, seed=args.seed
+    )
+    train, holdout = time_split(orders, args.holdout)
+    train_pairs = measure("聚合购买", stages, group_purchases, train)
+    
+    if args.backend == "als":
+        engine = ALSRecommendationEngine(None)
+        measure("构建矩阵", stages, engine.build_matrix_from_arrays, *train_pairs)
+        measure("训练因子", stages, engine.calculate_factors, args.factors, args.iterations)
+    else:
+        engine = RecommendationEngine(None)
+        measure("构建矩阵", stages, engine.build_matrix_from_arrays, *train_pairs)
+        measure("计算近邻", stages, engine.calculate_item_neighbors, args.top_k)
+    model = measure("生成模型", stages, engine.train)
+    
+    metrics = evaluate(model, train_pairs, holdout, args.k, args.eval_users, args.seed)
+    
+    print("=" * 60)
+    print(f"数据规模：{args.users} 用户 / {args.products} 商品 / {args.orders} 订单"
+          f"（训练 {len(train['user_id'])}，留出 {len(holdout['user_id'])}）")
+    print(f"矩阵：{engine.user_item_matrix.shape[0]}×{engine.user_item_matrix.shape[1]}，"
+          f"非零元素 {engine.user_item_matrix.nnz}，算法 {args.backend}")
+    print("-" * 60)
+    print(f"{'阶段':<10}{'耗时(秒)':>12}{'内存峰值(MB)':>16}")
+    for label, stat in stages.items():
+        print(f"{label:<10}{stat['seconds']:>12.3f}{stat['peak_mb']:>16.1f}")
+    print("-" * 60)
+    if metrics["users"]:
+        print(f"评估用户数：{metrics['users']}")
+        print(f"precision@{args.k}: {metrics['precision']:.4f}    recall@{args.k}: {metrics['recall']:.4f}")
+        print(f"单用户打分延迟：平均 {metrics['latency_mean_ms']:.3f} ms，P95 {metrics['latency_p95_ms']:.3f} ms")
+    else:
+        print("留出集中没有可评估的用户")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
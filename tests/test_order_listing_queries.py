@@ -0,0 +1,108 @@
+"""
+订单列表查询次数测试
+买家 / 商家订单列表的关联名称随订单一次JOIN查出，查询次数不随每页数量变化
+
+使用内存SQLite，无需启动后端或MySQL：
+    python tests/test_order_listing_queries.py
+    或 pytest tests/test_order_listing_queries.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "false")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Merchant, Product, Order
+from api.user import get_user_orders
+from api.merchant import get_merchant_orders
+
+PAGE_SIZES = (1, 20, 100)
+
+
+def create_session():
+    """创建内存数据库：2个商家、10个商品、1个买家的120个订单"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    db.add_all([Merchant(merchant_id=m, name=f"商家{m}", password_hash="x") for m in (1, 2)])
+    db.add(User(user_id=1, username="buyer", password_hash="x", email="buyer@example.com"))
+    db.add_all([
+        Product(product_id=p, merchant_id=p % 2 + 1, name=f"商品{p}", price=10, stock=100, category="数码", status=1)
+        for p in range(1, 11)
+    ])
+    now = datetime.now()
+    db.add_all([
+        Order(
+            order_id=o, user_id=1, product_id=o % 10 + 1, merchant_id=(o % 10 + 1) % 2 + 1,
+            quantity=1, unit_price=10, total_amount=10, order_time=now - timedelta(minutes=o), status="pending"
+        )
+        for o in range(1, 121)
+    ])
+    db.commit()
+    db.expunge_all()
+    return engine, db
+
+
+def count_queries(engine, db, call) -> int:
+    """统计一次调用执行的SQL语句数"""
+    db.expunge_all()
+    counter = {"queries": 0}
+
+    def _count(*args):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return counter["queries"]
+
+
+def test_user_orders_query_count_is_constant():
+    """买家订单列表：查询次数与每页数量无关，且名称正确"""
+    engine, db = create_session()
+    user = db.get(User, 1)
+    counts = set()
+    for size in PAGE_SIZES:
+        counts.add(count_queries(engine, db, lambda: get_user_orders(
+            page=1, size=size, cursor=None, with_total=False, user=user, db=db
+        )))
+    assert len(counts) == 1, f"查询次数随每页数量变化: {counts}"
+
+    items = get_user_orders(page=1, size=5, cursor=None, with_total=False, user=user, db=db)["data"]["items"]
+    assert items[0]["order_id"] == 1
+    assert items[0]["product_name"] == "商品2"
+    assert items[0]["merchant_name"] == "商家1"
+
+
+def test_merchant_orders_query_count_is_constant():
+    """商家订单列表：查询次数与每页数量无关，且名称正确"""
+    engine, db = create_session()
+    merchant = db.get(Merchant, 1)
+    counts = set()
+    for size in PAGE_SIZES:
+        counts.add(count_queries(engine, db, lambda: get_merchant_orders(
+            page=1, size=size, status=None, cursor=None, with_total=False, merchant=merchant, db=db
+        )))
+    assert len(counts) == 1, f"查询次数随每页数量变化: {counts}"
+
+    items = get_merchant_orders(
+        page=1, size=5, status=None, cursor=None, with_total=False, merchant=merchant, db=db
+    )["data"]["items"]
+    assert items[0]["buyer_username"] == "buyer"
+    assert items[0]["product_name"] == "商品2"
+
+
+if __name__ == "__main__":
+    for test in (test_user_orders_query_count_is_constant, test_merchant_orders_query_count_is_constant):
+        test()
+        print(f"✓ {test.__name__}")
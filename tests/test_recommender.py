@@ -0,0 +1,163 @@
+"""
+推荐引擎测试
+时间衰减在稠密 / 稀疏矩阵下一致生效，增量共现计数与全量重建结果一致，
+热门商品兜底按商品销量计数排序、不受已取消订单影响
+
+使用内存SQLite，无需启动后端或MySQL：
+    python tests/test_recommender.py
+    或 pytest tests/test_recommender.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "false")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import settings
+from database import Base
+from models import User, Merchant, Product, Order
+from ai.recommender import RecommendationEngine, IncrementalCooccurrence
+from services.product_sales import update_sales_counters, CANCELLED_STATUS
+
+HALF_LIFE_DAYS = 10.0
+
+# (订单ID, 用户ID, 商品ID, 距今天数)
+ORDERS = [
+    (1, 1, 1, 40), (2, 1, 2, 35), (3, 1, 3, 1),
+    (4, 2, 1, 2), (5, 2, 2, 3), (6, 2, 4, 20),
+    (7, 3, 2, 15), (8, 3, 3, 0), (9, 3, 4, 5),
+    (10, 4, 1, 8), (11, 4, 4, 8), (12, 4, 4, 30),
+]
+
+
+def create_session():
+    """创建内存数据库：1个商家、4个商品、4个买家的订单"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    db.add(Merchant(merchant_id=1, name="商家1", password_hash="x"))
+    db.add_all([
+        User(user_id=u, username=f"buyer{u}", password_hash="x", email=f"buyer{u}@example.com")
+        for u in range(1, 5)
+    ])
+    db.add_all([
+        Product(product_id=p, merchant_id=1, name=f"商品{p}", price=10, stock=100, category="数码", status=1)
+        for p in range(1, 5)
+    ])
+    now = datetime.now()
+    db.add_all([
+        Order(
+            order_id=order_id, user_id=user_id, product_id=product_id, merchant_id=1,
+            quantity=1, unit_price=10, total_amount=10, order_time=now - timedelta(days=days), status="pending"
+        )
+        for order_id, user_id, product_id, days in ORDERS
+    ])
+    db.commit()
+    return db
+
+
+def with_half_life(half_life_days, call):
+    """临时修改衰减半衰期配置后执行"""
+    previous = settings.RECOMMENDER_DECAY_HALF_LIFE_DAYS
+    settings.RECOMMENDER_DECAY_HALF_LIFE_DAYS = half_life_days
+    try:
+        return call()
+    finally:
+        settings.RECOMMENDER_DECAY_HALF_LIFE_DAYS = previous
+
+
+def test_dense_matrix_applies_decay():
+    """稠密矩阵与稀疏矩阵使用相同的衰减权重"""
+    db = create_session()
+    dense_engine, sparse_engine = RecommendationEngine(db), RecommendationEngine(db)
+    dense = with_half_life(HALF_LIFE_DAYS, lambda: dense_engine.build_user_item_matrix(use_sparse=False))
+    matrix = with_half_life(HALF_LIFE_DAYS, lambda: sparse_engine.build_user_item_matrix(use_sparse=True))
+
+    assert isinstance(dense, np.ndarray)
+    assert np.allclose(dense, matrix.toarray(), atol=1e-4)
+    # 用户4在8天前和30天前各买过一次商品4，权重之和约为 0.5^0.8 + 0.5^3
+    row, col = list(dense_engine.user_ids).index(4), list(dense_engine.item_ids).index(4)
+    assert abs(dense[row, col] - (0.5 ** 0.8 + 0.5 ** 3)) < 1e-3
+
+
+def test_incremental_purchase_matches_rebuild():
+    """衰减模式下，增量记录的新购买与全量重建得到相同的近邻相似度"""
+    db = create_session()
+    engine = RecommendationEngine(db)
+    with_half_life(HALF_LIFE_DAYS, engine.build_user_item_matrix)
+    tracker = IncrementalCooccurrence.from_matrix(
+        engine.user_item_matrix, engine.user_ids, engine.item_ids, engine.last_order_id,
+        engine.decay_half_life_days, engine.decay_reference
+    )
+
+    # 训练之后下单：用户1再买商品4，用户2买商品3
+    purchased_at = datetime.now()
+    for order_id, user_id, product_id in ((13, 1, 4), (14, 2, 3)):
+        db.add(Order(
+            order_id=order_id, user_id=user_id, product_id=product_id, merchant_id=1,
+            quantity=1, unit_price=10, total_amount=10, order_time=purchased_at, status="pending"
+        ))
+        tracker.add_purchase(user_id, product_id, purchased_at)
+    db.commit()
+
+    rebuilt_engine = RecommendationEngine(db)
+    with_half_life(HALF_LIFE_DAYS, rebuilt_engine.build_user_item_matrix)
+    rebuilt = IncrementalCooccurrence.from_matrix(
+        rebuilt_engine.user_item_matrix, rebuilt_engine.user_ids, rebuilt_engine.item_ids
+    )
+
+    for product_id in range(1, 5):
+        ids, scores = tracker.neighbors(product_id, 3)
+        expected_ids, expected_scores = rebuilt.neighbors(product_id, 3)
+        assert ids == expected_ids, f"商品{product_id}的近邻不一致: {ids} != {expected_ids}"
+        assert np.allclose(scores, expected_scores, atol=1e-4)
+
+
+def test_hot_products_ignore_cancelled_orders():
+    """热门商品兜底按销量计数排序，已取消订单不影响排名，且不再聚合订单表"""
+    db = create_session()
+    # 与下单 / 取消接口相同：同一事务内增减销量计数。商品1的5件订单被取消，商品2、商品3各有有效订单
+    for order_id, product_id, quantity in ((21, 1, 5), (22, 2, 2), (23, 3, 1)):
+        db.add(Order(
+            order_id=order_id, user_id=1, product_id=product_id, merchant_id=1,
+            quantity=quantity, unit_price=10, total_amount=10 * quantity, status="pending"
+        ))
+        update_sales_counters(db, product_id, quantity)
+    db.get(Order, 21).status = CANCELLED_STATUS
+    update_sales_counters(db, 1, 5, sign=-1)
+    db.commit()
+
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", _record)
+    try:
+        hot = RecommendationEngine(db)._get_hot_products(2)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", _record)
+
+    assert [item["product_id"] for item in hot] == [2, 3]
+    assert not any("orders" in statement for statement in statements), "热门商品查询不应读取订单表"
+
+    excluded = RecommendationEngine(db)._get_hot_products(1, exclude_ids=[2])
+    assert [item["product_id"] for item in excluded] == [3]
+
+
+if __name__ == "__main__":
+    for test in (
+        test_dense_matrix_applies_decay,
+        test_incremental_purchase_matches_rebuild,
+        test_hot_products_ignore_cancelled_orders
+    ):
+        test()
+        print(f"✓ {test.__name__}")